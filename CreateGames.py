@@ -1,9 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import re
+from typing import Dict, List
 from NCTypes import Game, Matchup, Player, Team
 from api import API
-from data import NO_GAME_PLAYED, TAB_TO_GAME_RANGE_MAPPING, CGAMES_TAB_TO_TABLE_RANGE_MAPPING, UNKNOWN_PLAYER_NAME
+from checkpoint import GameCreationCheckpoint
+from data import NO_GAME_PLAYED, TAB_TO_GAME_RANGE_MAPPING, UNKNOWN_PLAYER_NAME
 from sheet import GoogleSheet
+from sheet_rows import MatchupRow, get_tab_phase, parse_new_game_rows
 
 from utils import log_exception, log_message
 
@@ -75,6 +78,9 @@ class CreateGames:
         self.config = config
         self.sheet = GoogleSheet(config)
         self.api = API(config)
+        self.checkpoint = GameCreationCheckpoint(
+            config.get("create_games_checkpoint_path", "data/create_games_checkpoint.jsonl")
+        )
 
     def run(self):
         """
@@ -88,78 +94,110 @@ class CreateGames:
                 "CreateGames.run",
             )
 
-            # Create games for each row missing links
+            # Read every tab in one batch before creating games for each row missing links
+            sheet_values = self.sheet.get_rows_batch(
+                [f"{tab}!A1:B1" for tab in tabs]
+                + [
+                    f"{tab}!{TAB_TO_GAME_RANGE_MAPPING[get_tab_phase(tab)]}"
+                    for tab in tabs
+                ]
+            )
             for tab in tabs:
-                self.initialize_game_matchups(tab)
+                self.initialize_game_matchups(tab, sheet_values)
         except Exception as e:
             log_exception(e)
+        finally:
+            self.api.close()
 
     def initialize_game_matchups(
         self,
         tab: str,
+        sheet_values: Dict[str, List[List[str]]],
     ):
-        tab_phase = re.search("^(_\w+)", tab).group(1)
-        tab_status = self.sheet.get_rows(f"{tab}!A1:B1")
+        tab_phase = get_tab_phase(tab)
+        tab_status = sheet_values[f"{tab}!A1:B1"]
         game_range = TAB_TO_GAME_RANGE_MAPPING[tab_phase]
-        table_range = CGAMES_TAB_TO_TABLE_RANGE_MAPPING[tab_phase]
         round = tab[1:]
 
-        tab_rows_values = self.sheet.get_rows(f"{tab}!{game_range}")
-        table_rows_values = (
-            self.sheet.get_rows(f"{tab}!{table_range}") if table_range else []
-        )
+        tab_rows_values = sheet_values[f"{tab}!{game_range}"]
 
         # parse the games to be made
-        group, team_a, team_b = "", "", ""
-        for i, row in enumerate(tab_rows_values):
-            row.extend("" for _ in range(9 - len(row)))
-            if row[0]:
-                # Update group and team values
-                group, team_a, team_b = row[0], row[1], row[4]
-                if row[6] != "done":
-                    row.extend("" for _ in range(7 - len(row)))
-                    row[6] = "done"
+        games_to_create = []
+        for game_row in parse_new_game_rows(tab_rows_values):
+            if isinstance(game_row, MatchupRow):
+                game_row.mark_done()
                 log_message(
-                    f"Checking games for {round}-{group}-{team_b}: {team_a} vs. {team_b}",
+                    f"Checking games for {round}-{game_row.group}-{game_row.team_b}: {game_row.team_a} vs. {game_row.team_b}",
                     "initialize_game_matchups",
                 )
                 continue
-            elif not row[1]:
-                continue
 
             if (
-                row[1].strip() == UNKNOWN_PLAYER_NAME
-                or row[4].strip() == UNKNOWN_PLAYER_NAME
+                game_row.player_a == UNKNOWN_PLAYER_NAME
+                or game_row.player_b == UNKNOWN_PLAYER_NAME
             ):
                 # one of the  teams does not have enough players. forfeit and do notcreate any game
-                row[3] = NO_GAME_PLAYED
+                game_row.result = NO_GAME_PLAYED
                 continue
 
-            if row[8]:
-                print(f"\tChanging the template on line {i} to: {row[8]}")
-                template = row[8].strip()
+            if game_row.template:
+                print(
+                    f"\tChanging the template on line {game_row.index} to: {game_row.template}"
+                )
+                template = game_row.template
+            if game_row.player_a_id is None or game_row.player_b_id is None:
+                log_message(
+                    f"\tSkipping line {game_row.index} without both player links: {game_row.player_a} vs. {game_row.player_b}",
+                    "initialize_game_matchups",
+                )
+                continue
             # parse new game
             player_a = Player(
-                row[1].strip(),
-                int(re.search(r"^.*?p=(\d*).*$", row[2]).group(1)),
-                Team(team_a),
+                game_row.player_a, game_row.player_a_id, Team(game_row.team_a)
             )
             player_b = Player(
-                row[4].strip(),
-                int(re.search(r"^.*?p=(\d*).*$", row[5] or 0).group(1)),
-                Team(team_b),
+                game_row.player_b, game_row.player_b_id, Team(game_row.team_b)
             )
 
-            if not row[6]:
+            if not game_row.game_link:
                 # game does not exist yet
-                game = Game([player_a, player_b], Game.Outcome.UNDEFINED, row[6])
-                self.create_games(
-                    game,
-                    f"{round} - {group}",
-                    template,
+                checkpoint_key = GameCreationCheckpoint.get_key(
+                    tab, game_row.index, player_a.id, player_b.id
+                )
+                created_game_id = self.checkpoint.get(checkpoint_key)
+                if created_game_id:
+                    log_message(
+                        f"\tReusing game {created_game_id} created by a previous run for {player_a} vs. {player_b}",
+                        "initialize_game_matchups",
+                    )
+                    game_row.game_link = f"{API.GAME_URL}{created_game_id}"
+                    continue
+                game = Game([player_a, player_b], Game.Outcome.UNDEFINED, "")
+                games_to_create.append(
+                    (
+                        game_row,
+                        checkpoint_key,
+                        game,
+                        f"{round} - {game_row.group}",
+                        template,
+                    )
                 )
-                row[6] = f"https://www.warzone.com/MultiPlayer?GameID={game.link}"
+
+        # Create the games in parallel, checkpointing each one as soon as it is created
+        with ThreadPoolExecutor(max_workers=self.api.max_in_flight) as executor:
+            for _ in executor.map(
+                lambda e: self.create_and_checkpoint_game(*e[1:]), games_to_create
+            ):
+                pass
+        for game_row, _, game, _, _ in games_to_create:
+            if game.link:
+                game_row.game_link = f"{API.GAME_URL}{game.link}"
+
         self.sheet.update_rows_raw(f"{tab}!{game_range}", tab_rows_values)
+        if not self.sheet.dryrun:
+            # The links are in the sheet now, so the checkpoint is no longer needed. A dry run writes nothing, so the
+            # games created by a previous run must stay checkpointed
+            self.checkpoint.clear_tab(tab)
         if len(tab_status[0]) < 2:
             tab_status[0].append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         else:
@@ -167,6 +205,13 @@ class CreateGames:
             tab_status[0][1] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.sheet.update_rows_raw(f"{tab}!A1:B1", tab_status)
 
+    def create_and_checkpoint_game(
+        self, checkpoint_key: str, game: Game, round: str, template: str
+    ):
+        self.create_games(game, round, template)
+        if game.link and not self.api.dryrun:
+            self.checkpoint.record(checkpoint_key, str(game.link))
+
     def create_games(self, game: Game, round: str, template: str):
         title = f"Nations' Cup 2025 {round}"
         description = f"""This game is a part of the Nations' Cup 2025 {round}, run by Rento. You have 3 days to join the game.
@@ -1,20 +1,70 @@
 import json
-import re
 from typing import List
 from api import API
+from data import TAB_TO_GAME_RANGE_MAPPING
+from NCTypes import Game
+from season_store import SeasonStore
 from sheet import GoogleSheet
+from sheet_rows import (
+    GameColumn,
+    GameRow,
+    get_tab_phase,
+    parse_game_id,
+    parse_game_rows,
+)
 from utils import log_exception, log_message
 
 
 class GetFunStats:
+    """
+    Collects the chat of every played game. A game is included once it has a result, unless it was deleted from the
+    lobby (ie. nobody played it), whether the tab is read from the season store or from the sheet.
+    """
 
     def __init__(self, config):
         self.config = config
         self.sheet = GoogleSheet(config)
         self.api = API(config)
+        self.season_store = SeasonStore(
+            config.get("season_store_path", "data/season.db")
+        )
 
-    def convert_wz_game_link_to_id(self, game_link: str):
-        return game_link[43:]
+    def get_stored_game_rows(self, tab: str) -> List[List[str]]:
+        """
+        Returns the finished games of a tab from the season store in the same layout as the sheet rows:
+        [player, profile, result, player, profile, game link]
+        """
+        return [
+            [
+                game["player_a_name"],
+                f"https://www.warzone.com/Profile?p={game['player_a_id']}",
+                "defeats" if game["winner_id"] == game["player_a_id"] else "loses to",
+                game["player_b_name"],
+                f"https://www.warzone.com/Profile?p={game['player_b_id']}",
+                game["link"],
+            ]
+            for game in self.season_store.get_games(
+                tab=tab, outcome=Game.Outcome.FINISHED.value
+            )
+            if game["status"] != SeasonStore.DELETED_STATUS
+        ]
+
+    def get_sheet_game_rows(self, tab: str) -> List[List[str]]:
+        """
+        Returns the finished games of a tab from the sheet in the same layout as `get_stored_game_rows`.
+        """
+        return [
+            game_row.row[GameColumn.PLAYER_A : GameColumn.GAME_LINK + 1]
+            for game_row in parse_game_rows(
+                self.sheet.get_rows(
+                    f"{tab}!{TAB_TO_GAME_RANGE_MAPPING[get_tab_phase(tab)]}"
+                )
+            )
+            if isinstance(game_row, GameRow)
+            and game_row.game_id
+            and game_row.result in ("defeats", "loses to")
+            and game_row.status != SeasonStore.DELETED_STATUS
+        ]
 
     def run(self):
         try:
@@ -26,16 +76,15 @@ class GetFunStats:
             games_with_chat = {}
             for tab in tabs_to_update:
                 log_message(f"checking the following tab: {tab}", "GetFunStats.run")
-                is_finals = "_Finals" in tab
-                tab_rows = self.sheet.get_rows(
-                    f"{tab}!{'L2:Q300' if is_finals else'K2:P350'}"
-                )
+                # Tabs that pgames has not stored yet are read from the sheet
+                tab_rows = self.get_stored_game_rows(tab)
+                if not tab_rows:
+                    tab_rows = self.get_sheet_game_rows(tab)
                 games_with_chat[tab] = []
                 for row in tab_rows:
-                    if row and len(row) == 6 and "?GameID" in row[5]:
-                        chat = self.api.get_game_chat(
-                            self.convert_wz_game_link_to_id(row[-1])
-                        )
+                    game_id = parse_game_id(row[-1])
+                    if game_id:
+                        chat = self.api.get_game_chat(game_id)
                         if chat:
                             games_with_chat[tab].append((row + chat))
                 print(f"found {len(games_with_chat[tab])} games in {tab}\n")
@@ -45,3 +94,5 @@ class GetFunStats:
                 json.dump(games_with_chat, output_file)
         except Exception as e:
             log_exception(e)
+        finally:
+            self.api.close()
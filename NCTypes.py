@@ -5,6 +5,7 @@ from bidict import bidict
 
 
 class Player:
+    __slots__ = ("name", "id", "team")
 
     def __init__(self, name: str, id: str, team: "Team"):
         self.name = name
@@ -23,6 +24,7 @@ class Player:
 
 
 class Team:
+    __slots__ = ("name", "players")
 
     def __init__(self, name: str):
         self.name = name
@@ -33,6 +35,7 @@ class Team:
 
 
 class Matchup:
+    __slots__ = ("teams", "games")
 
     def __init__(self, team_a: Team, team_b: Team):
         self.teams: List[Team] = sorted([team_a, team_b])
@@ -62,6 +65,8 @@ class Game:
         FINISHED = "Finished"
         UNDEFINED = "undefined"
 
+    __slots__ = ("outcome", "winner", "players", "link")
+
     def __init__(self, players, outcome=Outcome.UNDEFINED, link="") -> None:
         self.outcome: Game.Outcome = outcome
         self.winner: str = ""
@@ -112,6 +117,8 @@ class WarzonePlayer:
         REMOVED_BY_HOST = "RemovedByHost"
         UNDEFINED = "undefined"
 
+    __slots__ = ("name", "id", "team", "score", "outcome")
+
     def __init__(self, name, id, outcome="", team=""):
         self.name: str = name
         self.id: int = id
@@ -134,6 +141,7 @@ class WarzonePlayer:
 
 
 class WarzoneGame:
+    __slots__ = ("outcome", "winner", "players", "link", "start_time", "round")
 
     def __init__(
         self,
@@ -200,6 +208,7 @@ TEAM_NAME_TO_API_VALUE = bidict(
 
 
 class TeamResult:
+    __slots__ = ("name", "players", "round_wins", "round_losses", "games_result")
 
     def __init__(self, name) -> None:
         self.name: str = name
@@ -221,6 +230,7 @@ class TeamResult:
 
 
 class RoundResult:
+    __slots__ = ("opp", "pts_for", "pts_against", "wins", "losses", "total")
 
     def __init__(self, opp: str, starting_pts_for=0, starting_pts_against=0) -> None:
         self.opp = opp
@@ -242,6 +252,7 @@ class RoundResult:
 
 
 class PlayerResult:
+    __slots__ = ("name", "id", "wins", "losses", "team")
 
     def __init__(self, name, id, team) -> None:
         self.name: str = name
@@ -254,7 +265,28 @@ class PlayerResult:
         return f"[{self.name} - {self.id} - {self.team}]"
 
 
+class CountryResult:
+    __slots__ = ("name", "wins", "losses")
+
+    def __init__(self, name) -> None:
+        self.name: str = name
+        self.wins: int = 0
+        self.losses: int = 0
+
+    def __repr__(self) -> str:
+        return f"[{self.name} - {self.wins} - {self.losses}]"
+
+
 class TableTeamResult:
+    __slots__ = (
+        "round",
+        "group",
+        "team",
+        "wins_adjusted",
+        "wins",
+        "losses",
+        "unstarted_games",
+    )
 
     def __init__(
         self,
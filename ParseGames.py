@@ -1,10 +1,9 @@
+import asyncio
+import copy
 from datetime import datetime, timedelta, timezone
-import json
-import os
 import random
 from typing import Dict, List, Tuple
 
-import jsonpickle
 from NCTypes import (
     Game,
     PlayerResult,
@@ -13,6 +12,7 @@ from NCTypes import (
     WarzonePlayer,
 )
 from api import API
+from async_api import AsyncAPI
 from data import (
     NO_GAME_PLAYED,
     TAB_TO_GAME_RANGE_MAPPING,
@@ -20,52 +20,149 @@ from data import (
     CGAMES_TAB_TO_TABLE_RANGE_MAPPING,
     UNKNOWN_PLAYER_NAME,
 )
+from game_queue import FinishedGameQueue
+from ledger import StandingsLedger
+from season_store import SeasonStore
 from sheet import GoogleSheet
-import re
+from sheet_rows import (
+    GameColumn,
+    GameRow,
+    MatchupRow,
+    get_tab_phase,
+    parse_game_id,
+    parse_game_rows,
+)
+from standings import CountryStandings, TeamTableResults
+import serializer
 
 from utils import log_exception, log_message
 
 
 class ParseGames:
+    PLAYER_STANDINGS_RANGE = "Player Standings!A2:E300"
+    TEAM_STANDINGS_RANGE = "Team Standings!A1:C50"
 
     def __init__(self, config):
         self.config = config
         self.sheet = GoogleSheet(config)
         self.api = API(config)
+        # With `async_api` the WZ API client, its session, rate limiter and cache are kept on their own event loop between
+        # runs, the same as the sync client when the bot hosts pgames
+        self.async_loop: asyncio.AbstractEventLoop | None = None
+        self.async_api: AsyncAPI | None = None
+        self.ledger = StandingsLedger(
+            config.get("standings_ledger_path", "data/standings_ledger.json")
+        )
+        self.finished_game_queue = FinishedGameQueue(
+            config.get("finished_game_queue_path", "data/finished_games.db"),
+            config.get("finished_game_socket_path", "data/finished_games.sock"),
+        )
+        self.season_store = SeasonStore(
+            config.get("season_store_path", "data/season.db")
+        )
+        if not self.season_store.get_player_count():
+            # New store, copy every player over from the ledger on the next save
+            self.ledger.changed_players.update(self.ledger.players)
 
-    def run(self):
+    def run(self, rebuild=False, close=True):
         """
-        Reads the google sheets games and updates finished games. Newly finished games are stored in a buffer file for the discord bot to read
+        Reads the google sheets games and updates finished games. Newly finished games are queued for the discord bot, which is woken up after every tab
+
+        Player standings are kept in a ledger and only newly finished games are added to them. Use `rebuild` to recount every finished game in the sheet.
+        Pass `close=False` to keep the WZ API clients (sync or async) open for the next run (ie. when hosted by the bot).
         """
         try:
             log_message("Running ParseGames", "ParseGames.run")
+            if self.ledger.reload_if_changed():
+                log_message(
+                    "Reloaded the standings ledger written by another process",
+                    "ParseGames.run",
+                )
+            if rebuild:
+                log_message("Rebuilding the standings ledger", "ParseGames.run")
+                self.ledger.clear()
+            # Always re-read the statuses, a long running process would otherwise miss new tabs
             tabs_to_update = self.sheet.get_tabs_by_status(
-                [GoogleSheet.TabStatus.IN_PROGRESS, GoogleSheet.TabStatus.FINISHED]
+                [GoogleSheet.TabStatus.IN_PROGRESS, GoogleSheet.TabStatus.FINISHED],
+                refresh=True,
             )
             log_message(
                 f"The following tabs are in-progress: '{tabs_to_update}'",
                 "ParseGames.run",
             )
-            team_table_results = self.parse_team_table_results(tabs_to_update)
+            sheet_values, sheet_formulas = self.read_sheet_ranges(tabs_to_update)
+            team_table_results = self.parse_team_table_results(
+                tabs_to_update, sheet_values
+            )
             newly_finished_games, games_to_delete, team_results, player_results = (
-                self.update_new_games(team_table_results, tabs_to_update)
+                self.update_new_games(
+                    team_table_results, tabs_to_update, sheet_values, sheet_formulas
+                )
             )
-            print(f"\n\n=================\nGames to delete:\n{games_to_delete}")
-            self.delete_unstarted_games(games_to_delete)
-            self.write_newly_finished_games(newly_finished_games)
-            self.write_player_standings(player_results)
-            self.write_team_standings(team_results)
+            print(f"\n\n=================\nDeleted games:\n{games_to_delete}")
+            self.write_player_standings(
+                player_results, sheet_values[ParseGames.PLAYER_STANDINGS_RANGE]
+            )
+            self.write_team_standings(
+                team_results, sheet_values[ParseGames.TEAM_STANDINGS_RANGE]
+            )
+            self.ledger.save()
+            self.season_store.put_player_results(
+                self.ledger.players, self.ledger.pop_changed_players()
+            )
+            self.season_store.put_team_table_results(team_results.to_dict())
+            self.finished_game_queue.notify(FinishedGameQueue.STANDINGS)
         except Exception as e:
             log_exception(e)
+            # Start the next run from the last saved ledger, same as a new process would
+            self.ledger.clear()
+            self.ledger.load()
+        finally:
+            # Write whatever was completed, even if a later step failed
+            try:
+                self.sheet.flush_updates()
+            except Exception as e:
+                log_exception(e)
+            if close:
+                self.close()
+
+    def read_sheet_ranges(
+        self, tabs: List[str]
+    ) -> Tuple[Dict[str, List[List[str]]], Dict[str, List[List[str]]]]:
+        """
+        Reads every range needed by the run in one batch for the formatted values and one batch for the table formulas.
 
-    def parse_team_table_results(self, tabs: List[str]) -> Dict[str, TableTeamResult]:
-        team_table_results: Dict[str, TableTeamResult] = {}
+        Returns a tuple of dictionaries (range -> rows) for the values and the formulas.
+        """
+        value_ranges = [
+            ParseGames.PLAYER_STANDINGS_RANGE,
+            ParseGames.TEAM_STANDINGS_RANGE,
+        ]
+        formula_ranges = []
         for tab in tabs:
-            tab_phase = re.search("^(_\w+)", tab).group(1)
+            tab_phase = get_tab_phase(tab)
+            value_ranges.append(f"{tab}!A1:B1")
+            value_ranges.append(f"{tab}!{TAB_TO_GAME_RANGE_MAPPING[tab_phase]}")
+            value_ranges.append(f"{tab}!{TAB_TO_TABLE_RANGE_MAPPING[tab_phase]}")
+            if CGAMES_TAB_TO_TABLE_RANGE_MAPPING[tab_phase]:
+                table_range = f"{tab}!{CGAMES_TAB_TO_TABLE_RANGE_MAPPING[tab_phase]}"
+                value_ranges.append(table_range)
+                formula_ranges.append(table_range)
+
+        return self.sheet.get_rows_batch(value_ranges), self.sheet.get_rows_batch(
+            formula_ranges, formulas=True
+        )
+
+    def parse_team_table_results(
+        self, tabs: List[str], sheet_values: Dict[str, List[List[str]]]
+    ) -> TeamTableResults:
+        team_table_results = TeamTableResults()
+        for tab in tabs:
+            tab_phase = get_tab_phase(tab)
             table_range = TAB_TO_TABLE_RANGE_MAPPING[tab_phase]
             round = tab[1:]
 
-            table_rows_values = self.sheet.get_rows(f"{tab}!{table_range}")
+            table_rows_values = sheet_values[f"{tab}!{table_range}"]
 
             #######################
             ##### Parse Table #####
@@ -83,34 +180,21 @@ class ParseGames:
                         # update group if finals tab (no divider between rounds)
                         group = row[0]
                     # Parse team results
-                    team_table_results[f"{round}-{group}-{row[1]}"] = TableTeamResult(
-                        round, group, row[1], row[2], row[3], row[4]
+                    team_table_results.add(
+                        TableTeamResult(round, group, row[1], row[2], row[3], row[4])
                     )
         return team_table_results
 
-    def sum_team_standings_in_phase(
-        self,
-        team_table_results: Dict[str, TableTeamResult],
-        phase: str,
-        group: str,
-        team: str,
-    ) -> Tuple[int, float, int]:
-        matched_elements = [
-            e[1]
-            for e in team_table_results.items()
-            if phase in e[0] and f"{group}-{team}" in e[0]
-        ]
-        return (
-            sum([e.wins for e in matched_elements]),
-            sum([e.wins_adjusted for e in matched_elements]),
-            sum([e.losses for e in matched_elements]),
-        )
-
     def update_new_games(
-        self, team_table_results: Dict[str, TableTeamResult], tabs: List[str]
+        self,
+        team_table_results: TeamTableResults,
+        tabs: List[str],
+        sheet_values: Dict[str, List[List[str]]],
+        sheet_formulas: Dict[str, List[List[str]]],
     ):
         """
-        Checks all game tabs for games that have newly finished. Writes the new results in the tab.
+        Checks all game tabs for games that have newly finished. Writes the new results in the tab. Each tab is written to
+        the sheet before its lobby games are deleted and its finished games are queued for the bot.
 
         Returns a dictionary of lists ({round name -> List[Games])
         {
@@ -124,23 +208,75 @@ class ParseGames:
         newly_finished_games: Dict[str, List[WarzoneGame]] = {}
         newly_finished_games_count = 0
         games_to_delete: List[WarzoneGame] = []
-        player_results: Dict[int, PlayerResult] = {}
+        # Finished games found in the sheet this run. Anything else in the ledger was removed by hand
+        seen_game_keys = set()
+
+        # Collect the games of every tab first so that they can be checked in one concurrent batch
+        tab_data = []
+        game_ids: List[str] = []
         for tab in tabs:
-            tab_phase = re.search("^(_\w+)", tab).group(1)
-            tab_status = self.sheet.get_rows(f"{tab}!A1:B1")
+            tab_phase = get_tab_phase(tab)
+            tab_status = sheet_values[f"{tab}!A1:B1"]
             game_range = TAB_TO_GAME_RANGE_MAPPING[tab_phase]
             table_range = CGAMES_TAB_TO_TABLE_RANGE_MAPPING[tab_phase]
-            round = tab[1:]
 
-            tab_rows_values = self.sheet.get_rows(f"{tab}!{game_range}")
+            tab_rows_values = sheet_values[f"{tab}!{game_range}"]
             table_rows_values = (
-                self.sheet.get_rows(f"{tab}!{table_range}") if table_range else []
+                sheet_values[f"{tab}!{table_range}"] if table_range else []
             )
             table_rows_formulas = (
-                self.sheet.get_rows_formulas(f"{tab}!{table_range}")
-                if table_range
-                else []
+                sheet_formulas[f"{tab}!{table_range}"] if table_range else []
+            )
+            # Snapshot the rows as read so that only the changed cells are written back
+            original_rows = (
+                copy.deepcopy(tab_rows_values),
+                copy.deepcopy(table_rows_formulas),
             )
+            # The rows wrap the sheet rows, so results set while applying the checked games are written back
+            tab_game_rows = parse_game_rows(tab_rows_values)
+            game_ids.extend(self.collect_game_ids(tab_game_rows))
+            tab_data.append(
+                (
+                    tab,
+                    tab_phase,
+                    tab_status,
+                    game_range,
+                    table_range,
+                    tab_rows_values,
+                    tab_game_rows,
+                    table_rows_values,
+                    table_rows_formulas,
+                    original_rows,
+                )
+            )
+
+        log_message(
+            f"Checking {len(game_ids)} games across {len(tabs)} tabs",
+            "update_new_games",
+        )
+        if self.config.get("async_api"):
+            checked_games = self.check_games_async(game_ids)
+        else:
+            checked_games = self.api.check_games(game_ids)
+
+        for (
+            tab,
+            tab_phase,
+            tab_status,
+            game_range,
+            table_range,
+            tab_rows_values,
+            tab_game_rows,
+            table_rows_values,
+            table_rows_formulas,
+            (original_tab_rows_values, original_table_rows_formulas),
+        ) in tab_data:
+            round = tab[1:]
+            tab_newly_finished_games: Dict[str, List[WarzoneGame]] = {}
+            # (row, game) of the games checked in this tab and season store rows of the finished games in the sheet
+            tab_checked_games: List[Tuple[GameRow, WarzoneGame]] = []
+            tab_finished_game_rows: List[Dict] = []
+            tab_games_to_delete: List[WarzoneGame] = []
 
             log_message(
                 f"Checking games in game log tab '{tab}' - {len(tab_rows_values)}",
@@ -149,362 +285,261 @@ class ParseGames:
             #######################
             ##### Parse Games #####
             #######################
-            group, team_a, team_b, score_row = "", "", "", []
-            for row in tab_rows_values:
-                row.extend("" for _ in range(9 - len(row)))
-                if (not row[0] and not row[1]) or (not row[3] and not row[6]):
-                    # Finished the previous matchup
-                    team_a, team_b, score_row = "", "", []
-                else:
-                    if row[0]:
-                        # update the current round/group
-                        group = row[0]
+            for game_row in tab_game_rows:
+                if isinstance(game_row, MatchupRow):
+                    if game_row.team_a:
+                        log_message(
+                            f"Checking games for {tab} - {game_row.team_a} vs {game_row.team_b}",
+                            "update_new_games",
+                        )
+                    continue
+
+                group, team_a, team_b = game_row.group, game_row.team_a, game_row.team_b
+                if not game_row.result:
+                    # check if a game has been created (ie. there are players on both teams)
+                    if not game_row.game_link:
+                        # No game, one or both players are missing
+                        game_row.result = NO_GAME_PLAYED
+                        team_table_results.add_unstarted_game(round, group, team_a)
+                        team_table_results.add_unstarted_game(round, group, team_b)
+                        continue
+
+                    # Game to check
+                    game_id = game_row.game_id
+                    if game_id not in checked_games:
+                        # Failed to query the game, it will be checked again next run
+                        log_message(
+                            f"Skipping game {game_id} since it could not be checked",
+                            "update_new_games",
+                        )
+                        continue
+                    game = checked_games[game_id]
+                    game_key = game_row.game_link
+                    if game.players[0].id != game_row.player_a_id:
+                        game.players.reverse()
+                    game.players[0].team, game.players[1].team = team_a, team_b
+                    tab_checked_games.append((game_row, game))
+                    game.players[0].score, game.players[1].score = (
+                        team_table_results.get_phase_totals(
+                            tab_phase[1:], group, team_a
+                        ).wins_adjusted,
+                        team_table_results.get_phase_totals(
+                            tab_phase[1:], group, team_b
+                        ).wins_adjusted,
+                    )
 
-                    if not team_a and not team_b and row[1]:
-                        # New teams to add
-                        team_a, team_b, score_row = (
-                            row[1].strip(),
-                            row[4].strip(),
-                            row,
+                    # Game is not finished, but we will update the progress (ie round or stage)
+                    if game.outcome == Game.Outcome.WAITING_FOR_PLAYERS:
+                        game_row.status = "Lobby"
+                    elif game.outcome == Game.Outcome.DISTRIBUTING_TERRITORIES:
+                        game_row.status = "Picks"
+                    else:
+                        game_row.status = f"Turn {game.round}"
+
+                    # declined_players = [str(player) for player in game.players if player.outcome == WarzonePlayer.Outcome.DECLINED]
+                    # if len(declined_players):
+                    #     log_message(f"Game at lobby with declined player(s): {', '.join(declined_players)}", 'parseGames.update_new_games')
+
+                    # if game.outcome == Game.Outcome.WAITING_FOR_PLAYERS:
+                    #     invited_players = [str(player) for player in game.players if player.outcome == WarzonePlayer.Outcome.INVITED]
+                    #     print(f"{game.link} - nonjoin after: {(game.start_time + timedelta(days=4)).isoformat()} {', '.join(invited_players)}")
+
+                    if game.outcome == Game.Outcome.FINISHED:
+                        seen_game_keys.add(game_key)
+                        # Game is finished, assign the defeat/loses to label
+                        log_message(
+                            f"New game finished with the following outcome: {game.players[0].name.encode()} {game.players[0].outcome} v {game.players[1].name.encode()} {game.players[1].outcome} ({game.link})",
+                            "update_new_games",
                         )
-                        if team_a:
-                            log_message(
-                                f"Checking games for {tab} - {team_a} vs {team_b}",
-                                "update_new_games",
+                        tab_newly_finished_games.setdefault(
+                            f"{round}-{group}", []
+                        ).append(game)
+                        newly_finished_games_count += 1
+                        if game.players[0].outcome == WarzonePlayer.Outcome.WON:
+                            # Left team wins
+                            loser = game.players[1]
+                            game_row.result = "defeats"
+                            game.players[0].score += 1
+                            game_row.matchup.record_win(True)
+                            game.winner = [game.players[0].id]
+                            team_table_results.record_game(round, group, team_a, True)
+                            team_table_results.record_game(round, group, team_b, False)
+                            self.record_finished_game(
+                                game_key,
+                                (game.players[0].id, game.players[0].name, team_a),
+                                (game.players[1].id, game.players[1].name, team_b),
+                                True,
                             )
-                    elif not row[3]:
-                        # check if a game has been created (ie. there are players on both teams)
-                        if not row[6]:
-                            # No game, one or both players are missing
-                            row[3] = NO_GAME_PLAYED
-                            team_table_results[
-                                f"{round}-{group}-{team_a}"
-                            ].unstarted_games += 1
-                            team_table_results[
-                                f"{round}-{group}-{team_b}"
-                            ].unstarted_games += 1
-                            continue
-
-                        # Game to check
-                        game = self.api.check_game(
-                            self.convert_wz_game_link_to_id(row[6].strip())
+                        elif game.players[1].outcome == WarzonePlayer.Outcome.WON:
+                            # Right team wins
+                            loser = game.players[0]
+                            game_row.result = "loses to"
+                            game.players[1].score += 1
+                            game_row.matchup.record_win(False)
+                            game.winner = [game.players[1].id]
+                            team_table_results.record_game(round, group, team_a, False)
+                            team_table_results.record_game(round, group, team_b, True)
+                            self.record_finished_game(
+                                game_key,
+                                (game.players[0].id, game.players[0].name, team_a),
+                                (game.players[1].id, game.players[1].name, team_b),
+                                False,
+                            )
+                        else:
+                            # Randomly assign win (probably because they voted to end)
+                            left_team_won = bool(random.getrandbits(1))
+                            loser = game.players[int(left_team_won)]
+                            game_row.result = "defeats" if left_team_won else "loses to"
+                            game.players[0 if left_team_won else 1].score += 1
+                            game_row.matchup.record_win(left_team_won)
+                            game.winner = [game.players[0 if left_team_won else 1].id]
+                            team_table_results.record_game(
+                                round, group, team_a, left_team_won
+                            )
+                            team_table_results.record_game(
+                                round, group, team_b, not left_team_won
+                            )
+                            self.record_finished_game(
+                                game_key,
+                                (game.players[0].id, game.players[0].name, team_a),
+                                (game.players[1].id, game.players[1].name, team_b),
+                                left_team_won,
+                            )
+                        if loser.outcome == WarzonePlayer.Outcome.BOOTED:
+                            game_row.status = f"Turn {game.round} - Booted"
+
+                    elif (
+                        game.outcome == Game.Outcome.WAITING_FOR_PLAYERS
+                        and datetime.now(timezone.utc) - game.start_time
+                        > timedelta(days=4)
+                    ):
+                        # Game has been in the join lobby for too long. Game will be deleted and appropriate winner selected according to algorithm:
+                        # 1. Assign win to left player if they have joined, or are invited and the right player declined
+                        # 2. Assign win to the right player if they have joined, or are invited and the left player declined
+                        # 3. Randomly assign win if both players are invited, or declined
+                        log_message(
+                            f"New game passed join time: {game.players[0].name.encode()} {game.players[0].outcome} v {game.players[1].name.encode()} {game.players[1].outcome} ({game.link})",
+                            "update_new_games",
                         )
-                        if game.players[0].id != int(
-                            re.search(r"^.*?p=(\d*).*$", row[2]).group(1)
+                        log_message(f"Storing end response: {game}")
+                        seen_game_keys.add(game_key)
+                        tab_newly_finished_games.setdefault(
+                            f"{round}-{group}", []
+                        ).append(game)
+                        newly_finished_games_count += 1
+                        game_row.status = SeasonStore.DELETED_STATUS
+                        if game.players[0].outcome == WarzonePlayer.Outcome.PLAYING or (
+                            game.players[0].outcome == WarzonePlayer.Outcome.INVITED
+                            and game.players[1].outcome
+                            == WarzonePlayer.Outcome.DECLINED
                         ):
-                            game.players.reverse()
-                        game.players[0].team, game.players[1].team = team_a, team_b
-                        game.players[0].score, game.players[1].score = (
-                            self.sum_team_standings_in_phase(
-                                team_table_results, tab_phase[1:], group, team_a
-                            )[1],
-                            self.sum_team_standings_in_phase(
-                                team_table_results, tab_phase[1:], group, team_b
-                            )[1],
-                        )
-
-                        # Game is not finished, but we will update the progress (ie round or stage)
-                        if game.outcome == Game.Outcome.WAITING_FOR_PLAYERS:
-                            row[7] = "Lobby"
-                        elif game.outcome == Game.Outcome.DISTRIBUTING_TERRITORIES:
-                            row[7] = "Picks"
-                        else:
-                            row[7] = f"Turn {game.round}"
-
-                        # declined_players = [str(player) for player in game.players if player.outcome == WarzonePlayer.Outcome.DECLINED]
-                        # if len(declined_players):
-                        #     log_message(f"Game at lobby with declined player(s): {', '.join(declined_players)}", 'parseGames.update_new_games')
-
-                        # if game.outcome == Game.Outcome.WAITING_FOR_PLAYERS:
-                        #     invited_players = [str(player) for player in game.players if player.outcome == WarzonePlayer.Outcome.INVITED]
-                        #     print(f"{game.link} - nonjoin after: {(game.start_time + timedelta(days=4)).isoformat()} {', '.join(invited_players)}")
-
-                        if game.outcome == Game.Outcome.FINISHED:
-                            # Game is finished, assign the defeat/loses to label
-                            log_message(
-                                f"New game finished with the following outcome: {game.players[0].name.encode()} {game.players[0].outcome} v {game.players[1].name.encode()} {game.players[1].outcome} ({game.link})",
-                                "update_new_games",
+                            # Left team wins
+                            game_row.result = "defeats"
+                            game.players[0].score += 1
+                            game_row.matchup.record_win(True)
+                            game.winner = [game.players[0].id]
+                            team_table_results.record_game(round, group, team_a, True)
+                            team_table_results.record_game(round, group, team_b, False)
+                            self.record_finished_game(
+                                game_key,
+                                (game.players[0].id, game.players[0].name, team_a),
+                                (game.players[1].id, game.players[1].name, team_b),
+                                True,
                             )
-                            newly_finished_games.setdefault(
-                                f"{round}-{group}", []
-                            ).append(game)
-                            newly_finished_games_count += 1
-                            if game.players[0].outcome == WarzonePlayer.Outcome.WON:
-                                # Left team wins
-                                loser = game.players[1]
-                                row[3] = "defeats"
-                                game.players[0].score += 1
-                                score_row[2] = int(score_row[2]) + 1
-                                game.winner = [game.players[0].id]
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_a}"],
-                                    True,
-                                )
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_b}"],
-                                    False,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_a,
-                                    game.players[0].name,
-                                    game.players[0].id,
-                                    True,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_b,
-                                    game.players[1].name,
-                                    game.players[1].id,
-                                    False,
-                                )
-                            elif game.players[1].outcome == WarzonePlayer.Outcome.WON:
-                                # Right team wins
-                                loser = game.players[0]
-                                row[3] = "loses to"
-                                game.players[1].score += 1
-                                score_row[5] = int(score_row[5]) + 1
-                                game.winner = [game.players[1].id]
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_a}"],
-                                    False,
-                                )
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_b}"],
-                                    True,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_a,
-                                    game.players[0].name,
-                                    game.players[0].id,
-                                    False,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_b,
-                                    game.players[1].name,
-                                    game.players[1].id,
-                                    True,
-                                )
-                            else:
-                                # Randomly assign win (probably because they voted to end)
-                                left_team_won = bool(random.getrandbits(1))
-                                loser = game.players[int(left_team_won)]
-                                row[3] = "defeats" if left_team_won else "loses to"
-                                game.players[0 if left_team_won else 1].score += 1
-                                score_row[2 if left_team_won else 5] = (
-                                    int(score_row[2 if left_team_won else 5]) + 1
-                                )
-                                game.winner = [
-                                    game.players[0 if left_team_won else 1].id
-                                ]
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_a}"],
-                                    left_team_won,
-                                )
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_b}"],
-                                    not left_team_won,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_a,
-                                    game.players[0].name,
-                                    game.players[0].id,
-                                    left_team_won,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_b,
-                                    game.players[1].name,
-                                    game.players[1].id,
-                                    not left_team_won,
-                                )
-                            if loser.outcome == WarzonePlayer.Outcome.BOOTED:
-                                row[7] = f"Turn {game.round} - Booted"
-
-                        elif (
-                            game.outcome == Game.Outcome.WAITING_FOR_PLAYERS
-                            and datetime.now(timezone.utc) - game.start_time
-                            > timedelta(days=4)
+                        elif game.players[
+                            1
+                        ].outcome == WarzonePlayer.Outcome.PLAYING or (
+                            game.players[1].outcome == WarzonePlayer.Outcome.INVITED
+                            and game.players[0].outcome
+                            == WarzonePlayer.Outcome.DECLINED
                         ):
-                            # Game has been in the join lobby for too long. Game will be deleted and appropriate winner selected according to algorithm:
-                            # 1. Assign win to left player if they have joined, or are invited and the right player declined
-                            # 2. Assign win to the right player if they have joined, or are invited and the left player declined
-                            # 3. Randomly assign win if both players are invited, or declined
-                            log_message(
-                                f"New game passed join time: {game.players[0].name.encode()} {game.players[0].outcome} v {game.players[1].name.encode()} {game.players[1].outcome} ({game.link})",
-                                "update_new_games",
+                            # Right team wins
+                            game_row.result = "loses to"
+                            game.players[1].score += 1
+                            game_row.matchup.record_win(False)
+                            game.winner = [game.players[1].id]
+                            team_table_results.record_game(round, group, team_a, False)
+                            team_table_results.record_game(round, group, team_b, True)
+                            self.record_finished_game(
+                                game_key,
+                                (game.players[0].id, game.players[0].name, team_a),
+                                (game.players[1].id, game.players[1].name, team_b),
+                                False,
                             )
-                            log_message(f"Storing end response: {game}")
-                            newly_finished_games.setdefault(
-                                f"{round}-{group}", []
-                            ).append(game)
-                            newly_finished_games_count += 1
-                            row[7] = "Deleted"
-                            if game.players[
-                                0
-                            ].outcome == WarzonePlayer.Outcome.PLAYING or (
-                                game.players[0].outcome == WarzonePlayer.Outcome.INVITED
-                                and game.players[1].outcome
-                                == WarzonePlayer.Outcome.DECLINED
-                            ):
-                                # Left team wins
-                                row[3] = "defeats"
-                                game.players[0].score += 1
-                                score_row[2] = int(score_row[2]) + 1
-                                game.winner = [game.players[0].id]
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_a}"],
-                                    True,
-                                )
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_b}"],
-                                    False,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_a,
-                                    game.players[0].name,
-                                    game.players[0].id,
-                                    True,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_b,
-                                    game.players[1].name,
-                                    game.players[1].id,
-                                    False,
-                                )
-                            elif game.players[
-                                1
-                            ].outcome == WarzonePlayer.Outcome.PLAYING or (
-                                game.players[1].outcome == WarzonePlayer.Outcome.INVITED
-                                and game.players[0].outcome
-                                == WarzonePlayer.Outcome.DECLINED
-                            ):
-                                # Right team wins
-                                row[3] = "loses to"
-                                game.players[1].score += 1
-                                score_row[5] = int(score_row[5]) + 1
-                                game.winner = [game.players[1].id]
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_a}"],
-                                    False,
-                                )
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_b}"],
-                                    True,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_a,
-                                    game.players[0].name,
-                                    game.players[0].id,
-                                    False,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_b,
-                                    game.players[1].name,
-                                    game.players[1].id,
-                                    True,
-                                )
-                            else:
-                                # Some weird combo where neither player accepted
-                                # Randomly assign winner
-                                left_team_won = bool(random.getrandbits(1))
-                                row[3] = "defeats" if left_team_won else "loses to"
-                                game.players[0 if left_team_won else 1].score += 1
-                                game.winner = [
-                                    game.players[0 if left_team_won else 1].id
-                                ]
-                                score_row[2 if left_team_won else 5] = (
-                                    int(score_row[2 if left_team_won else 5]) + 1
-                                )
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_a}"],
-                                    left_team_won,
-                                )
-                                self.update_team_table_results(
-                                    team_table_results[f"{round}-{group}-{team_b}"],
-                                    not left_team_won,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_a,
-                                    game.players[0].name,
-                                    game.players[0].id,
-                                    left_team_won,
-                                )
-                                self.update_standings_with_game(
-                                    player_results,
-                                    team_b,
-                                    game.players[1].name,
-                                    game.players[1].id,
-                                    not left_team_won,
-                                )
-
-                            games_to_delete.append(game)
-                    elif not row[1] and not row[4]:
-                        # Empty matchup
-                        pass
-                    else:
-                        # Game is already done, but add the win to player standings
-                        if row[3] == NO_GAME_PLAYED:
-                            # No game, one or both players are missing
-                            team_table_results[
-                                f"{round}-{group}-{team_a}"
-                            ].unstarted_games += 1
-                            team_table_results[
-                                f"{round}-{group}-{team_b}"
-                            ].unstarted_games += 1
-                            continue
-
-                        left_player_id = int(
-                            re.search(r"^.*?p=(\d*).*$", row[2]).group(1)
+                        else:
+                            # Some weird combo where neither player accepted
+                            # Randomly assign winner
+                            left_team_won = bool(random.getrandbits(1))
+                            game_row.result = "defeats" if left_team_won else "loses to"
+                            game.players[0 if left_team_won else 1].score += 1
+                            game.winner = [game.players[0 if left_team_won else 1].id]
+                            game_row.matchup.record_win(left_team_won)
+                            team_table_results.record_game(
+                                round, group, team_a, left_team_won
+                            )
+                            team_table_results.record_game(
+                                round, group, team_b, not left_team_won
+                            )
+                            self.record_finished_game(
+                                game_key,
+                                (game.players[0].id, game.players[0].name, team_a),
+                                (game.players[1].id, game.players[1].name, team_b),
+                                left_team_won,
+                            )
+
+                        tab_games_to_delete.append(game)
+                elif not game_row.player_a and not game_row.player_b:
+                    # Empty matchup
+                    pass
+                else:
+                    # Game is already done, but add the win to player standings
+                    if game_row.result == NO_GAME_PLAYED:
+                        # No game, one or both players are missing
+                        team_table_results.add_unstarted_game(round, group, team_a)
+                        team_table_results.add_unstarted_game(round, group, team_b)
+                        continue
+
+                    if game_row.player_a_id is None or game_row.player_b_id is None:
+                        log_message(
+                            f"Skipping finished game in {tab} row {game_row.index} without both player links",
+                            "update_new_games",
                         )
-                        right_player_id = int(
-                            re.search(r"^.*?p=(\d*).*$", row[5]).group(1)
+                        continue
+
+                    game_key = game_row.game_link or f"{tab}!{game_row.index}"
+                    is_left_player_winner = game_row.result == "defeats"
+                    seen_game_keys.add(game_key)
+                    left_player = (
+                        game_row.player_a_id,
+                        game_row.row[GameColumn.PLAYER_A],
+                        team_a,
+                    )
+                    right_player = (
+                        game_row.player_b_id,
+                        game_row.row[GameColumn.PLAYER_B],
+                        team_b,
+                    )
+                    if game_row.game_id:
+                        tab_finished_game_rows.append(
+                            SeasonStore.get_finished_game_row(
+                                tab,
+                                group,
+                                game_key,
+                                left_player,
+                                right_player,
+                                is_left_player_winner,
+                                game_row.status,
+                            )
                         )
-                        is_left_player_winner = row[3] == "defeats"
-
-                        # winner
-                        player_results.setdefault(
-                            (
-                                left_player_id
-                                if is_left_player_winner
-                                else right_player_id
-                            ),
-                            PlayerResult(
-                                row[1] if is_left_player_winner else row[4],
-                                (
-                                    left_player_id
-                                    if is_left_player_winner
-                                    else right_player_id
-                                ),
-                                team_a if is_left_player_winner else team_b,
-                            ),
-                        ).wins += 1
-
-                        # loser
-                        player_results.setdefault(
-                            (
-                                left_player_id
-                                if not is_left_player_winner
-                                else right_player_id
-                            ),
-                            PlayerResult(
-                                row[1] if not is_left_player_winner else row[4],
-                                (
-                                    left_player_id
-                                    if not is_left_player_winner
-                                    else right_player_id
-                                ),
-                                team_a if not is_left_player_winner else team_b,
-                            ),
-                        ).losses += 1
+                    if self.ledger.has_game(
+                        game_key, left_player, right_player, is_left_player_winner
+                    ):
+                        # Already counted in a previous run
+                        continue
+
+                    self.ledger.record_game(
+                        game_key, left_player, right_player, is_left_player_winner
+                    )
 
             #######################
             ##### Parse Table #####
@@ -520,13 +555,14 @@ class ParseGames:
                         group = row[0]
                     else:
                         # Parse team results
-                        table_rows_formulas[i][3] = team_table_results[
-                            f"{round}-{group}-{row[1]}"
-                        ].wins
-                        table_rows_formulas[i][4] = team_table_results[
-                            f"{round}-{group}-{row[1]}"
-                        ].losses
-                self.sheet.update_rows_raw(f"{tab}!{table_range}", table_rows_formulas)
+                        team_result = team_table_results.get(round, group, row[1])
+                        table_rows_formulas[i][3] = team_result.wins
+                        table_rows_formulas[i][4] = team_result.losses
+                self.sheet.queue_changed_cells(
+                    f"{tab}!{table_range}",
+                    original_table_rows_formulas,
+                    table_rows_formulas,
+                )
 
             # Add the last updated time to the sheet so people know when it is broken
             if len(tab_status[0]) < 2:
@@ -534,14 +570,63 @@ class ParseGames:
             else:
                 # Overwrite previous value
                 tab_status[0][1] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.sheet.update_rows_raw(f"{tab}!A1:B1", tab_status)
-            self.sheet.update_rows_raw(f"{tab}!{game_range}", tab_rows_values)
+            self.sheet.queue_update(f"{tab}!A1:B1", tab_status)
+            self.sheet.queue_changed_cells(
+                f"{tab}!{game_range}", original_tab_rows_values, tab_rows_values
+            )
+            # The results must be in the sheet before the games are posted or deleted. Otherwise a failed write would
+            # leave posted games without a result, or lobbies deleted with a random winner that is picked again next run
+            self.sheet.flush_updates()
             log_message(
-                f"Finished updating games in {tab}. Newly finished games: {newly_finished_games_count}; games to delete: {len(games_to_delete)}",
+                f"Finished updating games in {tab}. Newly finished games: {newly_finished_games_count}; games to delete: {len(tab_games_to_delete)}",
                 "update_new_games",
             )
+            self.delete_unstarted_games(tab_games_to_delete)
+            games_to_delete.extend(tab_games_to_delete)
+            self.store_games(tab, tab_checked_games, tab_finished_game_rows)
+            # Hand the tab's games to the bot right away instead of waiting for the whole run
+            self.publish_finished_games(tab_newly_finished_games)
+            newly_finished_games.update(tab_newly_finished_games)
+
+        self.ledger.prune(seen_game_keys)
+        return (
+            newly_finished_games,
+            games_to_delete,
+            team_table_results,
+            self.ledger.player_results(),
+        )
 
-        return newly_finished_games, games_to_delete, team_table_results, player_results
+    def check_games_async(self, game_ids: List[str]) -> Dict[str, WarzoneGame]:
+        """
+        Checks the games concurrently through AsyncAPI. The client is created on the first run and reused until `close`.
+        """
+        if self.async_api is None:
+            self.async_loop = asyncio.new_event_loop()
+            self.async_api = AsyncAPI(self.config)
+        return self.async_loop.run_until_complete(self.async_api.check_games(game_ids))
+
+    def close(self):
+        """
+        Closes the WZ API connections of both clients.
+        """
+        self.api.close()
+        if self.async_api is not None:
+            self.async_loop.run_until_complete(self.async_api.close())
+            self.async_loop.close()
+            self.async_loop, self.async_api = None, None
+
+    def collect_game_ids(self, tab_game_rows: List[MatchupRow | GameRow]) -> List[str]:
+        """
+        Returns the IDs of the parsed games of a tab that need to be checked through the WZ API (ie. the games without a
+        result).
+        """
+        return [
+            game_row.game_id
+            for game_row in tab_game_rows
+            if isinstance(game_row, GameRow)
+            and not game_row.result
+            and game_row.game_id
+        ]
 
     def delete_unstarted_games(self, games_to_delete: List[WarzoneGame]):
         """
@@ -553,40 +638,59 @@ class ParseGames:
                 f"Deleting the following game: {game}", "delete_unstarted_games"
             )
             try:
-                self.api.delete_game(int(self.convert_wz_game_link_to_id(game.link)))
+                self.api.delete_game(int(parse_game_id(game.link)))
             except Exception as e:
                 failed_to_delete_games.append(game)
                 log_exception(f"Unable to delete game {game.link}:\n{e}")
 
-    def update_standings_with_game(
+    def store_games(
         self,
-        player_standings: Dict[int, PlayerResult],
-        team: str,
-        player_name: str,
-        player_id: int,
-        is_won: bool,
+        tab: str,
+        checked_games: List[Tuple[GameRow, WarzoneGame]],
+        finished_game_rows: List[Dict],
     ):
-        if is_won:
-            player_standings.setdefault(
-                player_id, PlayerResult(player_name, player_id, team)
-            ).wins += 1
-        else:
-            player_standings.setdefault(
-                player_id, PlayerResult(player_name, player_id, team)
-            ).losses += 1
-
-    def update_team_table_results(self, team_result: TableTeamResult, is_won: bool):
-        if is_won:
-            team_result.wins_adjusted += 1
-            team_result.wins += 1
-        else:
-            team_result.losses += 1
+        """
+        Writes the games of a tab to the season store. Checked games are given as (sheet row, game) and replace the
+        stored copy. Games that were already finished in the sheet are only added if they are missing (ie. on a new store).
+        """
+        self.season_store.put_games(
+            [
+                SeasonStore.get_game_row(tab, game_row.group, game, game_row.status)
+                for game_row, game in checked_games
+            ]
+        )
+        self.season_store.put_games(finished_game_rows, replace=False)
 
-    def convert_wz_game_link_to_id(self, game_link: str):
-        return game_link[43:]
+    def publish_finished_games(
+        self, newly_finished_games: Dict[str, List[WarzoneGame]]
+    ):
+        """
+        Queues the newly finished games for the discord bot and wakes it up. Games that were already queued are ignored.
+        """
+        queued = 0
+        for round_group, games in newly_finished_games.items():
+            queued += self.finished_game_queue.put(round_group, games)
+        if queued:
+            log_message(
+                f"Queued {queued} newly finished games", "publish_finished_games"
+            )
+            self.finished_game_queue.notify(FinishedGameQueue.GAMES)
+
+    def record_finished_game(
+        self,
+        game_key: str,
+        left_player: Tuple[int, str, str],
+        right_player: Tuple[int, str, str],
+        is_left_won: bool,
+    ):
+        """
+        Adds a newly finished game to the player standings. Players are given as (id, name, team).
+        """
+        self.ledger.record_game(game_key, left_player, right_player, is_left_won)
 
-    def write_player_standings(self, player_results: Dict[int, PlayerResult]):
-        current_data = self.sheet.get_rows("Player Standings!A2:E300")
+    def write_player_standings(
+        self, player_results: Dict[int, PlayerResult], current_data: List[List[str]]
+    ):
         for row in current_data:
             if row:
                 row[3] = player_results[int(row[1])].wins
@@ -599,82 +703,39 @@ class ParseGames:
             f"Updated player stats with a total {len(current_data)} rows",
             "write_standings",
         )
-        self.sheet.update_rows_raw("Player Standings!A2:E300", current_data)
+        self.sheet.queue_update(ParseGames.PLAYER_STANDINGS_RANGE, current_data)
 
-    def write_team_standings(self, team_results: Dict[str, TableTeamResult]):
-        current_data = self.sheet.get_rows("Team Standings!A1:C50")
+    def write_team_standings(
+        self, team_results: TeamTableResults, current_data: List[List[str]]
+    ):
+        country_standings = CountryStandings(team_results)
         seen_countries = set()
         for row in current_data:
             if row and row[0] != "Country":
-                row[1] = sum(
-                    [
-                        result[1].wins
-                        for result in team_results.items()
-                        if row[0] in result[0].split("-")[2]
-                    ]
-                )
-                row[2] = sum(
-                    [
-                        result[1].losses
-                        for result in team_results.items()
-                        if row[0] in result[0].split("-")[2]
-                    ]
-                )
-                seen_countries.add(row[0])
-        for key, ts in team_results.items():
-            if key.split("-")[2] not in seen_countries:
+                # Rows are countries, or single teams added before the rows were per country
+                country_result = country_standings.get(row[0])
+                row[1], row[2] = country_result.wins, country_result.losses
+                seen_countries.add(CountryStandings.get_country(row[0]))
+        for country, country_result in country_standings.countries.items():
+            if country not in seen_countries:
                 current_data.append(
-                    [
-                        ts.team,
-                        ts.wins,
-                        ts.losses,
-                    ]
+                    [country, country_result.wins, country_result.losses]
                 )
 
         log_message(
             f"Updated team stats with a total {len(current_data)} rows",
             "write_standings",
         )
-        self.sheet.update_rows_raw(
-            f"Team Standings!A1:C{len(current_data)}", current_data
+        self.sheet.queue_update(f"Team Standings!A1:C{len(current_data)}", current_data)
+        log_message(
+            "JSON version of team standings saved to 'team_standings.json' and 'country_standings.json'",
+            "write_team_standings",
+        )
+        serializer.dump(
+            "team_standings", team_results.to_dict(), "data/team_standings.json"
+        )
+        serializer.dump(
+            "country_standings",
+            country_standings.countries,
+            "data/country_standings.json",
         )
-        with open("data/team_standings.json", "w", encoding="utf-8") as output_file:
-            log_message(
-                "JSON version of newly finished games saved to 'team_standings.json'",
-                "write_team_standings",
-            )
-            json.dump(jsonpickle.encode(team_results), output_file)
-
-    def write_newly_finished_games(
-        self, newly_finished_games: Dict[str, List[WarzoneGame]]
-    ):
-        """
-        Combines the existing newly_finished_games that have not been posted yet with the newly finished games from this check
-        """
-
-        if not os.path.isfile("data/newly_finished_games.json"):
-            with open(
-                "data/newly_finished_games.json", "w", encoding="utf-8"
-            ) as output_file:
-                json.dump(jsonpickle.encode({}), output_file)
-        with open(
-            "data/newly_finished_games.json", "r", encoding="utf-8"
-        ) as input_file:
-            buffer_newly_finished_games = jsonpickle.decode(json.load(input_file))
-            conmbined_newly_finished = {
-                key: buffer_newly_finished_games.get(key, [])
-                + newly_finished_games.get(key, [])
-                for key in set(
-                    list(buffer_newly_finished_games.keys())
-                    + list(newly_finished_games.keys())
-                )
-            }
-
-        with open(
-            "data/newly_finished_games.json", "w", encoding="utf-8"
-        ) as output_file:
-            log_message(
-                "JSON version of newly finished games saved to 'newly_finished_games.json'",
-                "write_newly_finished_games",
-            )
-            json.dump(jsonpickle.encode(conmbined_newly_finished), output_file)
@@ -19,7 +19,10 @@ class ValidatePlayers:
         Reads the google sheets games and updates finished games. Newly finished games are stored in a buffer file for the discord bot to read
         """
         log_message("Running ValidatePlayers", "ValidatePlayers.run")
-        self.validate_players_on_templates()
+        try:
+            self.validate_players_on_templates()
+        finally:
+            self.api.close()
 
     def validate_players_on_templates(self):
         sheet_rows = self.sheet.get_rows("Rosters!C3:L300")
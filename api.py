@@ -1,11 +1,14 @@
 # https://www.warzone.com/wiki/Category:API
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 import requests
+from requests.adapters import HTTPAdapter
 import urllib.parse
 
+from cache import GameCache
 from NCTypes import TEAM_NAME_TO_API_VALUE, Game, WarzoneGame, WarzonePlayer
-from utils import log_message
+from utils import log_exception, log_message
 
 
 class API:
@@ -24,18 +27,64 @@ class API:
     def __init__(self, config):
         self.config = config
         self.dryrun = "dryrun" in config and config["dryrun"]
+        self.max_in_flight = int(config.get("max_in_flight_requests", 8))
+        self.timeout = (
+            float(config.get("api_connect_timeout", 10)),
+            float(config.get("api_read_timeout", 30)),
+        )
+
+        # Keep connections to warzone.com alive across requests instead of a new TLS handshake per call
+        pool_size = int(config.get("api_pool_size", self.max_in_flight))
+        self.session = requests.Session()
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        )
+
+        self.game_cache = (
+            GameCache(config.get("game_cache_path", "data/game_cache.jsonl"))
+            if config.get("game_cache", True)
+            else None
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """
+        Closes the pooled connections to the WZ API.
+        """
+        self.session.close()
 
     def check_game(self, game_id: str) -> WarzoneGame:
         """
         Checks the progress and results of a game using the WZ API.
 
-        Returns the result of the game (in-progress or completed).
+        Returns the result of the game (in-progress or completed). Finished games are answered from the local game cache when possible.
         """
-        game_json = requests.post(
+        if self.game_cache:
+            cached_game = self.game_cache.get(game_id)
+            if cached_game:
+                return cached_game
+
+        game_json = self.session.post(
             f"{API.QUERY_GAME_ENDPOINT}?GameID={game_id}",
             {"Email": self.config["email"], "APIToken": self.config["token"]},
+            timeout=self.timeout,
         ).json()
+        game = API.parse_game(game_json)
+
+        if self.game_cache:
+            self.game_cache.put(game_id, game)
+        return game
 
+    @staticmethod
+    def parse_game(game_json: Dict) -> WarzoneGame:
+        """
+        Converts a GameFeed response into a WarzoneGame.
+        """
         players = []
         for player in game_json["players"]:
             players.append(
@@ -44,7 +93,7 @@ class API:
                 )
             )
 
-        game = WarzoneGame(
+        return WarzoneGame(
             players,
             Game.Outcome(game_json["state"]),
             f"{API.GAME_URL}{game_json['id']}",
@@ -54,7 +103,24 @@ class API:
             int(game_json["numberOfTurns"]),
         )
 
-        return game
+    def check_games(self, game_ids: List[str]) -> Dict[str, WarzoneGame]:
+        """
+        Checks a batch of games using the WZ API, with at most `max_in_flight` requests running at once.
+
+        Returns a dictionary of game ID -> result. Games that could not be checked are logged and left out.
+        """
+        checked_games: Dict[str, WarzoneGame] = {}
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            futures = {
+                executor.submit(self.check_game, game_id): game_id
+                for game_id in dict.fromkeys(game_ids)
+            }
+            for future in as_completed(futures):
+                try:
+                    checked_games[futures[future]] = future.result()
+                except Exception as e:
+                    log_exception(f"Unable to check game {futures[future]}: {e}")
+        return checked_games
 
     def get_game_chat(self, game_id: str) -> List[str]:
         """
@@ -62,9 +128,10 @@ class API:
 
         Returns the result of the game (in-progress or completed).
         """
-        game_json = requests.post(
+        game_json = self.session.post(
             f"{API.QUERY_GAME_ENDPOINT}?GameID={game_id}&GetChat=true",
             {"Email": self.config["email"], "APIToken": self.config["token"]},
+            timeout=self.timeout,
         ).json()
 
         return game_json["chat"] if "chat" in game_json else []
@@ -82,42 +149,18 @@ class API:
         #     "gameID": 25876586
         # }
 
-        data = {
-            "hostEmail": self.config["email"],
-            "hostAPIToken": self.config["token"],
-            "templateID": int(template),
-            "gameName": name,
-            "personalMessage": description,
-            "players": list(
-                map(
-                    lambda e: {"token": e[0], "team": TEAM_NAME_TO_API_VALUE[e[1]]},
-                    players,
-                )
-            ),
-        }
+        data = API.create_game_data(
+            self.config, players, template, name, description
+        )
         if self.dryrun:
             print("Running dryrun on game creation")
             game_response = {"gameID": 25876586}
             print(f"{name}\n{description}\n{data['players']}\n\n")
         else:
-            game_response = requests.post(
+            game_response = self.session.post(
                 API.CREATE_GAME_ENDPOINT,
-                json={
-                    "hostEmail": self.config["email"],
-                    "hostAPIToken": self.config["token"],
-                    "templateID": int(template),
-                    "gameName": name,
-                    "personalMessage": description,
-                    "players": list(
-                        map(
-                            lambda e: {
-                                "token": str(e[0]),
-                                "team": TEAM_NAME_TO_API_VALUE[e[1]],
-                            },
-                            players,
-                        )
-                    ),
-                },
+                json=data,
+                timeout=self.timeout,
             ).json()
 
         if "error" in game_response:
@@ -135,13 +178,14 @@ class API:
             print("Running dryrun on game deletion")
             game_response = {}
         else:
-            game_response = requests.post(
+            game_response = self.session.post(
                 API.DELETE_GAME_ENDPOINT,
                 json={
                     "Email": self.config["email"],
                     "APIToken": self.config["token"],
                     "gameID": game_id,
                 },
+                timeout=self.timeout,
             ).json()
 
         if "error" in game_response:
@@ -155,11 +199,43 @@ class API:
 
         Returns a tuple containing (True if not blacklisted, True if player has access to all templates, List of booleans on access for each template).
         """
-        validate_response = requests.post(
+        validate_response = self.session.post(
             f"{API.VALIDATE_INVITE_TOKEN_ENDPOINT}?Token={player_id}&TemplateIDs={','.join(templates)}",
             {"Email": self.config["email"], "APIToken": self.config["token"]},
+            timeout=self.timeout,
         ).json()
 
+        return API.parse_template_access(validate_response, templates)
+
+    @staticmethod
+    def create_game_data(
+        config,
+        players: List[Tuple[str, str]],
+        template: str,
+        name: str,
+        description: str,
+    ) -> Dict:
+        return {
+            "hostEmail": config["email"],
+            "hostAPIToken": config["token"],
+            "templateID": int(template),
+            "gameName": name,
+            "personalMessage": description,
+            "players": list(
+                map(
+                    lambda e: {
+                        "token": str(e[0]),
+                        "team": TEAM_NAME_TO_API_VALUE[e[1]],
+                    },
+                    players,
+                )
+            ),
+        }
+
+    @staticmethod
+    def parse_template_access(
+        validate_response: Dict, templates: List[str]
+    ) -> Tuple[bool, bool, List[bool]]:
         if "error" in validate_response:
             # Probably blacklisted
             return False, False, []
@@ -0,0 +1,245 @@
+# https://www.warzone.com/wiki/Category:API
+import asyncio
+import time
+from typing import Dict, List, Tuple
+
+import aiohttp
+
+from api import API
+from cache import GameCache
+from NCTypes import WarzoneGame
+from utils import log_exception, log_message
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter. Allows bursts of up to `capacity` requests and `rate` requests per second after that.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """
+        Stops handing out tokens for `seconds` (ie. when the server asks us to back off).
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class AsyncAPI:
+    """
+    asyncio version of API for use inside the bot's event loop (or through asyncio.run from the CLI commands).
+
+    Requests are rate limited with a token bucket, at most `max_in_flight` run at once and responses with HTTP 429 or 5xx
+    are retried after the server's Retry-After (or an exponential backoff).
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    class RequestException(Exception):
+        pass
+
+    def __init__(self, config):
+        self.config = config
+        self.dryrun = "dryrun" in config and config["dryrun"]
+        self.max_in_flight = int(config.get("max_in_flight_requests", 8))
+        self.max_retries = int(config.get("api_max_retries", 4))
+        self.rate_limiter = TokenBucket(
+            float(config.get("api_requests_per_second", 5)), self.max_in_flight
+        )
+        self.in_flight = asyncio.Semaphore(self.max_in_flight)
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=float(config.get("api_connect_timeout", 10)),
+            sock_read=float(config.get("api_read_timeout", 30)),
+        )
+        self.session: aiohttp.ClientSession | None = None
+        self.game_cache = (
+            GameCache(config.get("game_cache_path", "data/game_cache.jsonl"))
+            if config.get("game_cache", True)
+            else None
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def close(self):
+        """
+        Closes the pooled connections to the WZ API.
+        """
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def post(self, url: str, data: Dict | None = None, json: Dict | None = None) -> Dict:
+        if self.session is None:
+            # The session has to be created inside the running event loop
+            self.session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(
+                    limit=int(self.config.get("api_pool_size", self.max_in_flight))
+                ),
+            )
+
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            async with self.in_flight:
+                async with self.session.post(url, data=data, json=json) as response:
+                    if response.status not in AsyncAPI.RETRY_STATUSES:
+                        # WZ API errors are returned in the JSON body, same as API
+                        return await response.json(content_type=None)
+
+                    retry_after = response.headers.get("Retry-After", "")
+                    backoff = (
+                        float(retry_after)
+                        if retry_after.isdigit()
+                        else min(60, 2**attempt)
+                    )
+
+            log_message(
+                f"HTTP {response.status} from {url.split('?')[0]}, retrying in {backoff}s",
+                "AsyncAPI.post",
+            )
+            if response.status == 429:
+                # Every request is rate limited, not just this one
+                self.rate_limiter.pause(backoff)
+            await asyncio.sleep(backoff)
+
+        raise AsyncAPI.RequestException(
+            f"Gave up on {url.split('?')[0]} after {self.max_retries + 1} attempts"
+        )
+
+    async def check_game(self, game_id: str) -> WarzoneGame:
+        """
+        Checks the progress and results of a game using the WZ API.
+
+        Returns the result of the game (in-progress or completed). Finished games are answered from the local game cache when possible.
+        """
+        if self.game_cache:
+            cached_game = self.game_cache.get(game_id)
+            if cached_game:
+                return cached_game
+
+        game = API.parse_game(
+            await self.post(
+                f"{API.QUERY_GAME_ENDPOINT}?GameID={game_id}",
+                {"Email": self.config["email"], "APIToken": self.config["token"]},
+            )
+        )
+
+        if self.game_cache:
+            self.game_cache.put(game_id, game)
+        return game
+
+    async def check_games(self, game_ids: List[str]) -> Dict[str, WarzoneGame]:
+        """
+        Checks a batch of games concurrently.
+
+        Returns a dictionary of game ID -> result. Games that could not be checked are logged and left out.
+        """
+        game_ids = list(dict.fromkeys(game_ids))
+        results = await asyncio.gather(
+            *[self.check_game(game_id) for game_id in game_ids], return_exceptions=True
+        )
+
+        checked_games: Dict[str, WarzoneGame] = {}
+        for game_id, result in zip(game_ids, results):
+            if isinstance(result, Exception):
+                log_exception(f"Unable to check game {game_id}: {result}")
+            else:
+                checked_games[game_id] = result
+        return checked_games
+
+    async def get_game_chat(self, game_id: str) -> List[str]:
+        """
+        Returns the chat messages of a game using the WZ API.
+        """
+        game_json = await self.post(
+            f"{API.QUERY_GAME_ENDPOINT}?GameID={game_id}&GetChat=true",
+            {"Email": self.config["email"], "APIToken": self.config["token"]},
+        )
+
+        return game_json["chat"] if "chat" in game_json else []
+
+    async def create_game(
+        self, players: List[Tuple[str, str]], template: str, name: str, description: str
+    ) -> str:
+        """
+        Creates a game using the WZ API with the specified players, template, and game name/description.
+
+        Returns the game ID if successfully created, else raises a GameCreationException.
+        """
+        data = API.create_game_data(self.config, players, template, name, description)
+        if self.dryrun:
+            print("Running dryrun on game creation")
+            game_response = {"gameID": 25876586}
+            print(f"{name}\n{description}\n{data['players']}\n\n")
+        else:
+            game_response = await self.post(API.CREATE_GAME_ENDPOINT, json=data)
+
+        if "error" in game_response:
+            raise API.GameCreationException(game_response["error"])
+        else:
+            return game_response["gameID"]
+
+    async def delete_game(self, game_id: int):
+        """
+        Deletes a warzone game if a player did not join in time.
+
+        Returns None if successful, otherwise raises a GameDeletionException
+        """
+        if self.dryrun:
+            print("Running dryrun on game deletion")
+            game_response = {}
+        else:
+            game_response = await self.post(
+                API.DELETE_GAME_ENDPOINT,
+                json={
+                    "Email": self.config["email"],
+                    "APIToken": self.config["token"],
+                    "gameID": game_id,
+                },
+            )
+
+        if "error" in game_response:
+            raise API.GameDeletionException(f"Unable to delete game {game_id}")
+
+    async def validate_player_template_access(
+        self, player_id: str, templates: List[str]
+    ) -> Tuple[bool, bool, List[bool]]:
+        """
+        Checks if the player has access to the list of templates.
+
+        Returns a tuple containing (True if not blacklisted, True if player has access to all templates, List of booleans on access for each template).
+        """
+        validate_response = await self.post(
+            f"{API.VALIDATE_INVITE_TOKEN_ENDPOINT}?Token={player_id}&TemplateIDs={','.join(templates)}",
+            {"Email": self.config["email"], "APIToken": self.config["token"]},
+        )
+
+        return API.parse_template_access(validate_response, templates)
@@ -0,0 +1,121 @@
+"""
+Measures the memory and construction time of a full season of NCTypes objects: the matchups and games created by
+`cmatches`/`cgames`, the games checked by `pgames` and the player, round and team table results.
+
+Usage: python benchmarks/nctypes.py [TEAMS] (default: 64 teams of 6 players)
+"""
+
+from datetime import datetime
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NCTypes import (
+    Game,
+    Matchup,
+    Player,
+    PlayerResult,
+    TableTeamResult,
+    Team,
+    TeamResult,
+    WarzoneGame,
+    WarzonePlayer,
+)
+
+PLAYERS_PER_TEAM = 6
+ROUNDS = 5
+
+
+def build_season(team_count: int):
+    teams = []
+    for t in range(team_count):
+        team = Team(f"T{t:03}")
+        team.players = [
+            Player(f"Player {t}-{p}", 1000 * t + p, team)
+            for p in range(PLAYERS_PER_TEAM)
+        ]
+        teams.append(team)
+
+    matchups = []
+    games = []
+    for round in range(ROUNDS):
+        for t in range(0, team_count - 1, 2):
+            team_a, team_b = teams[t], teams[(t + 1 + 2 * round) % team_count]
+            matchup = Matchup(team_a, team_b)
+            matchup.import_games_from_pairing_lists(
+                [
+                    [team_a.players[i % PLAYERS_PER_TEAM] for i in range(12)],
+                    [
+                        team_b.players[(i + round) % PLAYERS_PER_TEAM]
+                        for i in range(12)
+                    ],
+                ]
+            )
+            matchups.append(matchup)
+            for i, game in enumerate(matchup.games):
+                left, right = game.players
+                warzone_game = WarzoneGame(
+                    [
+                        WarzonePlayer(left.name, int(left.id), "Won"),
+                        WarzonePlayer(right.name, int(right.id), "Eliminated"),
+                    ],
+                    Game.Outcome.FINISHED,
+                    f"https://www.warzone.com/MultiPlayer?GameID={len(games)}",
+                    datetime(2024, 1, 1),
+                    10 + i,
+                )
+                warzone_game.players[0].team = left.team.name
+                warzone_game.players[1].team = right.team.name
+                warzone_game.winner = [int(left.id)]
+                games.append(warzone_game)
+
+    team_results = {}
+    player_results = {}
+    table_results = {}
+    for matchup in matchups:
+        team_a, team_b = matchup.teams
+        for team, opp in ((team_a, team_b), (team_b, team_a)):
+            team_result = team_results.setdefault(team.name, TeamResult(team.name))
+            round = f"Main R{len(team_result.games_result) + 1}"
+            team_result.init_score(round, opp.name, 0, 0)
+            table_results[f"{round}-A-{team.name}"] = TableTeamResult(
+                round, "A", team.name, 0, 0, 0
+            )
+    for game in games:
+        for player in game.players:
+            player_result = player_results.setdefault(
+                player.id, PlayerResult(player.name, player.id, player.team)
+            )
+            if player.id in game.winner:
+                player_result.wins += 1
+            else:
+                player_result.losses += 1
+    return teams, matchups, games, team_results, player_results, table_results
+
+
+def benchmark(team_count: int, number: int = 5):
+    tracemalloc.start()
+    season = build_season(team_count)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    construction_time = (
+        timeit.timeit(lambda: build_season(team_count), number=number) / number
+    )
+    sort_time = (
+        timeit.timeit(
+            lambda: [sorted(game.players) for game in season[2]], number=number
+        )
+        / number
+    )
+
+    print(f"{team_count} teams, {len(season[2])} games, {len(season[4])} players")
+    print(f"  memory:       {current / 1024:8.1f} KiB (peak {peak / 1024:.1f} KiB)")
+    print(f"  construction: {construction_time * 1000:8.2f} ms")
+    print(f"  player sorts: {sort_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 64)
@@ -0,0 +1,64 @@
+"""
+Compares decoding the jsonpickle data files with the versioned serializer format.
+
+Usage: python benchmarks/serialization.py [FILE ...] (default: the team standings and NC2024 standings files)
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jsonpickle
+
+import serializer
+
+DEFAULT_FILES = ["data/team_standings.json", "data/NC2024/standings.json"]
+
+
+def benchmark(path: str, number: int = 20):
+    with open(path, "r", encoding="utf-8") as input_file:
+        legacy_text = input_file.read()
+    if not serializer.is_legacy(json.loads(legacy_text)):
+        print(f"{path}: already in the versioned format, run it on a jsonpickle file")
+        return
+
+    value = serializer.decode_legacy(json.loads(legacy_text))
+    kind = serializer.get_legacy_kind(value)
+    new_text = serializer.dumps(kind, value)
+
+    legacy_time = (
+        timeit.timeit(
+            lambda: jsonpickle.decode(json.loads(legacy_text)), number=number
+        )
+        / number
+    )
+    new_time = (
+        timeit.timeit(lambda: serializer.loads(new_text, kind), number=number)
+        / number
+    )
+    encode_legacy_time = (
+        timeit.timeit(lambda: json.dumps(jsonpickle.encode(value)), number=number)
+        / number
+    )
+    encode_new_time = (
+        timeit.timeit(lambda: serializer.dumps(kind, value), number=number) / number
+    )
+
+    print(f"{path} ({kind})")
+    print(
+        f"  size:   jsonpickle {len(legacy_text.encode()):>8} B | serializer {len(new_text.encode()):>8} B"
+    )
+    print(
+        f"  decode: jsonpickle {legacy_time * 1000:8.2f} ms | serializer {new_time * 1000:8.2f} ms ({legacy_time / new_time:.1f}x)"
+    )
+    print(
+        f"  encode: jsonpickle {encode_legacy_time * 1000:8.2f} ms | serializer {encode_new_time * 1000:8.2f} ms ({encode_legacy_time / encode_new_time:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or DEFAULT_FILES:
+        benchmark(path)
@@ -0,0 +1,128 @@
+"""
+Compares walking the game range of the tabs checked by pgames: the two walks pgames did before `sheet_rows` (one to
+collect the game IDs and one to read the games, with an uncompiled regex for every player link) against parsing each tab
+once with `sheet_rows.parse_game_rows` and reusing the parsed rows for both, as `ParseGames.update_new_games` does.
+
+Usage: python benchmarks/sheet_rows.py [MATCHUPS] (default: 100 matchups of 12 games in each of 5 tabs)
+"""
+
+import copy
+import os
+import re
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sheet_rows import GameRow, parse_game_rows
+
+TABS = 5
+GAMES_PER_MATCHUP = 12
+
+
+def build_tab(matchup_count: int) -> List[List[str]]:
+    """
+    Returns the game range of a tab, with the first half of the games finished and the rest still in progress.
+    """
+    rows = []
+    for m in range(matchup_count):
+        rows.append(
+            [
+                f"Group {m // 2}" if m % 2 == 0 else "",
+                f"T{m:03} A",
+                "0",
+                "vs.",
+                f"T{m:03} B",
+                "0",
+            ]
+        )
+        for g in range(GAMES_PER_MATCHUP):
+            player_a, player_b = 1000 * m + g, 1000 * m + 500 + g
+            rows.append(
+                [
+                    "",
+                    f"Player {player_a}",
+                    f"https://www.warzone.com/Profile?p={player_a}",
+                    "defeats" if g < GAMES_PER_MATCHUP // 2 else "",
+                    f"Player {player_b}",
+                    f"https://www.warzone.com/Profile?p={player_b}",
+                    f"https://www.warzone.com/MultiPlayer?GameID={10000000 + 100 * m + g}",
+                    f"Turn {g}",
+                ]
+            )
+        rows.append([])
+    return rows
+
+
+def walk_rows(tab_rows: List[List[str]]):
+    # The walk pgames did before sheet_rows: once to collect the game IDs and once more to read every game
+    team_a, team_b = "", ""
+    game_ids = []
+    for row in tab_rows:
+        row.extend("" for _ in range(9 - len(row)))
+        if (not row[0] and not row[1]) or (not row[3] and not row[6]):
+            team_a, team_b = "", ""
+        elif not team_a and not team_b and row[1]:
+            team_a, team_b = row[1].strip(), row[4].strip()
+        elif not row[3] and row[6]:
+            game_ids.append(row[6].strip()[43:])
+
+    team_a, team_b = "", ""
+    for row in tab_rows:
+        row.extend("" for _ in range(9 - len(row)))
+        if (not row[0] and not row[1]) or (not row[3] and not row[6]):
+            team_a, team_b = "", ""
+        elif not team_a and not team_b and row[1]:
+            team_a, team_b = row[1].strip(), row[4].strip()
+        elif row[1] or row[4]:
+            int(re.search(r"^.*?p=(\d*).*$", row[2]).group(1))
+            int(re.search(r"^.*?p=(\d*).*$", row[5]).group(1))
+    return game_ids
+
+
+def parse_rows(tab_rows: List[List[str]]):
+    # Parsed once, then used to collect the game IDs and again to read every game
+    game_rows = parse_game_rows(tab_rows)
+    game_ids = [
+        game_row.game_id
+        for game_row in game_rows
+        if isinstance(game_row, GameRow) and not game_row.result and game_row.game_id
+    ]
+    for game_row in game_rows:
+        if isinstance(game_row, GameRow):
+            game_row.team_a, game_row.team_b
+            game_row.player_a_id, game_row.player_b_id
+    return game_ids
+
+
+def time_walk(walk, tabs: List[List[List[str]]], number: int) -> float:
+    runs = [copy.deepcopy(tabs) for _ in range(number)]
+    start = time.perf_counter()
+    for run in runs:
+        for tab in run:
+            walk(tab)
+    return (time.perf_counter() - start) / number
+
+
+def benchmark(matchup_count: int, number: int = 20):
+    tabs = [build_tab(matchup_count) for _ in range(TABS)]
+    # Both walks must agree before they are timed
+    assert [walk_rows(copy.deepcopy(tab)) for tab in tabs] == [
+        parse_rows(copy.deepcopy(tab)) for tab in tabs
+    ]
+
+    # Both walks pad the rows in place, so every run gets its own copy of the tabs
+    walk_time = time_walk(walk_rows, tabs, number)
+    parse_time = time_walk(parse_rows, tabs, number)
+
+    rows = sum(len(tab) for tab in tabs)
+    print(f"{TABS} tabs, {matchup_count} matchups per tab, {rows} rows")
+    print(f"  two walks:       {walk_time * 1000:8.2f} ms")
+    print(
+        f"  parse_game_rows: {parse_time * 1000:8.2f} ms ({walk_time / parse_time:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
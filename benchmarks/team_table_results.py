@@ -0,0 +1,99 @@
+"""
+Compares the phase totals looked up for every checked game by pgames: the old substring scan over the "round-group-team"
+keys against the running totals of `TeamTableResults`.
+
+Usage: python benchmarks/team_table_results.py [TEAMS] (default: 500 teams in groups of 4 over 5 rounds)
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NCTypes import TableTeamResult
+from standings import TeamTableResults
+
+GROUP_SIZE = 4
+ROUNDS = 5
+GAMES_PER_MATCHUP = 12
+# The scan is too slow to run for every game of a large season, its time is extrapolated from this many games
+SCANNED_GAMES = 200
+
+
+def build_season(
+    team_count: int,
+) -> Tuple[List[Tuple[str, str, str, str]], List[TableTeamResult]]:
+    """
+    Returns the (round, group, team a, team b) of every game and the table results of every team in every round.
+    """
+    games = []
+    table_results = []
+    for round in range(1, ROUNDS + 1):
+        for g in range(team_count // GROUP_SIZE):
+            group = f"Group {g}"
+            teams = [f"T{g * GROUP_SIZE + t:03}" for t in range(GROUP_SIZE)]
+            for team in teams:
+                table_results.append(
+                    TableTeamResult(f"Main R{round}", group, team, 0, 0, 0)
+                )
+            for t in range(0, GROUP_SIZE, 2):
+                games.extend(
+                    [(f"Main R{round}", group, teams[t], teams[t + 1])]
+                    * GAMES_PER_MATCHUP
+                )
+    return games, table_results
+
+
+def sum_team_standings_in_phase(
+    team_table_results: Dict[str, TableTeamResult], phase: str, group: str, team: str
+) -> Tuple[int, float, int]:
+    # The lookup pgames did before TeamTableResults
+    matched_elements = [
+        e[1]
+        for e in team_table_results.items()
+        if phase in e[0] and f"{group}-{team}" in e[0]
+    ]
+    return (
+        sum([e.wins for e in matched_elements]),
+        sum([e.wins_adjusted for e in matched_elements]),
+        sum([e.losses for e in matched_elements]),
+    )
+
+
+def benchmark(team_count: int):
+    games, table_results = build_season(team_count)
+
+    keyed_results = {
+        f"{result.round}-{result.group}-{result.team}": result
+        for result in table_results
+    }
+    start = time.perf_counter()
+    for round, group, team_a, team_b in games[:SCANNED_GAMES]:
+        sum_team_standings_in_phase(keyed_results, "Main", group, team_a)
+        sum_team_standings_in_phase(keyed_results, "Main", group, team_b)
+    scan_time = (time.perf_counter() - start) / SCANNED_GAMES * len(games)
+
+    team_table_results = TeamTableResults()
+    for result in table_results:
+        team_table_results.add(result)
+    start = time.perf_counter()
+    for round, group, team_a, team_b in games:
+        team_table_results.get_phase_totals("Main", group, team_a)
+        team_table_results.get_phase_totals("Main", group, team_b)
+        team_table_results.record_game(round, group, team_a, True)
+        team_table_results.record_game(round, group, team_b, False)
+    index_time = time.perf_counter() - start
+
+    print(f"{team_count} teams, {len(table_results)} table results, {len(games)} games")
+    print(
+        f"  substring scan: {scan_time * 1000:10.1f} ms (extrapolated from {SCANNED_GAMES} games)"
+    )
+    print(
+        f"  phase totals:   {index_time * 1000:10.1f} ms ({scan_time / index_time:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -1,17 +1,24 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import hashlib
 import os
-from time import sleep
-from typing import Any, Dict, List, Tuple
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Tuple
 import discord
 import json
 from discord.ext import commands
-import jsonpickle
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from discord import app_commands
 import os
 
-from NCTypes import PlayerResult, TableTeamResult, TeamResult, WarzoneGame
+from game_queue import FinishedGameQueue
+from NCTypes import WarzoneGame
+from ParseGames import ParseGames
+from season_store import SeasonStore
+from standings import PlayerIndex, StandingsIndex, TeamScore
 from utils import log_exception, log_message
 
 intents = discord.Intents.default()
@@ -21,6 +28,9 @@ intents.message_content = True
 client = discord.Client(intents=intents)
 
 
+# Discord users allowed to run the queue and pgames admin commands
+ADMIN_USER_IDS = [162968893177069568, 281740561885691904]
+
 ROUND_TO_TEMPLATE = {
     "Qualifiers R1": "Guiroma KU",
     "Qualifiers R2": "Aseridith",
@@ -53,14 +63,82 @@ ROUND_TO_EMBED = {
 }
 
 
-def format_finals_round_results(standings):
-    if standings[1] > 6:
+def format_finals_round_results(standings: TeamScore):
+    if standings.points > 6:
         return "W "
-    elif standings[3] > 6:
+    elif standings.losses > 6:
         return "L "
     return "  "
 
 
+def build_game_embed(key: str, game: WarzoneGame) -> Tuple[discord.Embed, bool]:
+    """
+    Returns the game log embed of a finished game and True if CAN won the game.
+    """
+    round, group = key.split("-")
+    winners = [x for x in game.players if x.id in game.winner]
+    losers = [x for x in game.players if x.id not in game.winner]
+    embed = discord.Embed(
+        title=f"{', '.join([p.name for p in winners])} defeats {', '.join([p.name for p in losers])}"[
+            0:256
+        ],
+        description=f"[Game Link]({game.link})"[0:4096],
+        colour=ROUND_TO_COLOUR[round],
+    )
+    embed.add_field(
+        name=f"{round} {ROUND_TO_TEMPLATE[round]} - {group}"[0:256],
+        value=f"**{winners[0].team}** ({winners[0].score:g} pts) defeats **{losers[0].team}** ({losers[0].score:g} pts)"[
+            0:1024
+        ],
+    )
+    return embed, "CAN" in winners[0].team
+
+
+def render_standings_fields(
+    phase: str, standings_index: StandingsIndex
+) -> Tuple[str | None, List[Tuple[str, str, bool]]]:
+    """
+    Returns the description and fields (name, value, inline) of a phase's standings embed, without the timestamp.
+    """
+    description = (
+        "Each stage is best of 13 (first to 7 wins):" if phase == "Finals" else None
+    )
+    fields: List[Tuple[str, str, bool]] = []
+    for i, (group, team_scores) in enumerate(
+        standings_index.get_groups(phase).items()
+    ):
+        if (phase == "Main" or phase == "Finals") and i % 2 == 0 and i != 0:
+            fields.append(("\u200b", "\u200b", True))
+
+        if phase == "Qualifiers":
+            team_results_str = "\n".join(
+                [f"{e.team:5}|{e.points:4g}|{e.max_points:4g}" for e in team_scores]
+            )
+        elif phase == "Finals":
+            team_results_str = f"  Team  | Pts\n"
+            team_results_str += "\n".join(
+                [
+                    f"{format_finals_round_results(e)}{e.team:5} | {e.points:2g}"
+                    for e in team_scores
+                ]
+            )
+        else:
+            team_results_str = "\n".join(
+                [f"{e.team:5} | {e.points:2g} | {e.max_points:2g}" for e in team_scores]
+            )
+        fields.append((group, f"```{team_results_str}```"[0:1024], True))
+    if phase == "Finals":
+        fields.append(("\u200b", "\u200b", True))
+    fields.append(("\u200b", "\u200b", True))
+    return description, fields
+
+
+def get_embed_fingerprint(
+    description: str | None, fields: List[Tuple[str, str, bool]]
+) -> str:
+    return hashlib.sha256(json.dumps([description, fields]).encode()).hexdigest()
+
+
 class NCComands(commands.Cog):
 
     def __init__(self, bot: "NationsCupBot") -> None:
@@ -74,81 +152,36 @@ class NCComands(commands.Cog):
             await interaction.response.send_message("Only Justin can use this command")
             return
 
-        if not os.path.isfile("data/team_standings.json"):
-            await interaction.response.send_message("No team standings file exists yet")
+        standings_index = await self.bot.get_standings_index()
+        if not standings_index.groups:
+            await interaction.response.send_message("No team standings exist yet")
             return
 
-        with open("data/team_standings.json", "r", encoding="utf-8") as input_file:
-            team_standings: Dict[str, TableTeamResult] = jsonpickle.decode(
-                json.load(input_file)
-            )
-
         discord_channel = self.bot.get_channel(int(self.bot.config["score_channel"]))
         for phase, id in ROUND_TO_EMBED.items():
             if id == 0:
                 # Need to create embed if standings exist:
-                phase_standings = [
-                    ps for ps in team_standings.items() if phase in ps[0]
-                ]
-
-                if len(phase_standings):
-                    group_standings: Dict[str, List[TableTeamResult]] = {}
-                    for key, team_result in phase_standings:
-                        group_standings.setdefault(key.split("-")[1], []).append(
-                            team_result
-                        )
+                group_standings = standings_index.get_groups(phase)
 
+                if len(group_standings):
                     # new embed
                     embed = discord.Embed(
                         title=phase,
                         description="Scores are shown as:\n```team | Pts | MP```",
                         colour=ROUND_TO_COLOUR[phase],
                     )
-                    for i, (group, team_results) in enumerate(group_standings.items()):
+                    for i, (group, team_scores) in enumerate(group_standings.items()):
                         if phase == "Main" and i % 2 == 0 and i != 0:
                             embed.add_field(
                                 name="\u200b",
                                 value="\u200b",
                                 inline=True,
                             )
-                        if phase == "Qualifiers":
-                            total_games = (
-                                (len(set([result.team for result in team_results])) - 1)
-                                * 6
-                                * 2
-                            )
-                        else:
-                            total_games = 60
-                        team_scores: Dict[str, Tuple[str, float, float]] = {}
-                        for result in team_results:
-                            if result.team not in team_scores:
-                                # team_scores[result.team] = (result.team, result.wins_adjusted, result.wins, result.losses, result.wins+result.losses)
-                                team_scores[result.team] = (
-                                    result.team,
-                                    result.wins_adjusted,
-                                    result.wins_adjusted
-                                    - result.wins
-                                    - result.losses
-                                    - result.unstarted_games
-                                    + total_games,
-                                )
-                            else:
-                                scores = team_scores[result.team]
-                                # team_scores[result.team] = (scores[0], scores[1]+result.wins_adjusted, scores[2]+result.wins, scores[3]+result.losses, scores[4]+result.wins+result.losses)
-                                team_scores[result.team] = (
-                                    scores[0],
-                                    scores[1] + result.wins_adjusted,
-                                    scores[2]
-                                    + result.wins_adjusted
-                                    - result.wins
-                                    - result.losses
-                                    - result.unstarted_games,
-                                )
-                        team_scores_list = list(team_scores.values())
-                        team_scores_list.sort(key=lambda e: (e[1], e[2]), reverse=True)
-
                         team_results_str = "\n".join(
-                            [f"{e[0]:5}|{e[1]:4g}|{e[2]:4g}" for e in team_scores_list]
+                            [
+                                f"{e.team:5}|{e.points:4g}|{e.max_points:4g}"
+                                for e in team_scores
+                            ]
                         )
                         embed.add_field(
                             name=group,
@@ -160,6 +193,77 @@ class NCComands(commands.Cog):
                     sent_embed = await discord_channel.send(embed=embed)
         await interaction.channel.send("")
 
+    @app_commands.command(
+        name="standings", description="shows the team standings of a group"
+    )
+    @app_commands.describe(group="group name, ie. 'Group A' or 'A'")
+    async def standings(self, interaction: discord.Interaction, group: str):
+        standings_index = await self.bot.get_standings_index()
+        if not standings_index.groups:
+            await interaction.response.send_message("No team standings exist yet")
+            return
+
+        groups = standings_index.find_groups(group)
+        if not groups:
+            await interaction.response.send_message(f"No group named '{group}'")
+            return
+
+        embed = discord.Embed(
+            title=f"{groups[0][1]} standings",
+            description="Scores are shown as:\n```team | Pts | MP```",
+            colour=ROUND_TO_COLOUR[groups[-1][0]],
+        )
+        for phase, group_name, team_scores in groups:
+            team_results_str = "\n".join(
+                [
+                    f"{e.team:5} | {e.points:2g} | {e.max_points:2g}"
+                    for e in team_scores
+                ]
+            )
+            embed.add_field(
+                name=phase, value=f"```{team_results_str}```"[0:1024], inline=True
+            )
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(
+        name="player", description="shows the results of a player this season"
+    )
+    @app_commands.describe(player="player name, ID or profile link")
+    async def player(self, interaction: discord.Interaction, player: str):
+        player_index = await self.bot.get_player_index()
+        if not player_index.players:
+            await interaction.response.send_message("No player standings exist yet")
+            return
+
+        players = player_index.search(player)
+        if not players:
+            await interaction.response.send_message(f"No player found for '{player}'")
+            return
+
+        embed = discord.Embed(
+            title=players[0].name if len(players) == 1 else f"Players matching '{player}'"
+        )
+        for player_result in players:
+            games = player_result.wins + player_result.losses
+            embed.add_field(
+                name=f"{player_result.name} ({player_result.team})"[0:256],
+                value=f"{player_result.wins}W - {player_result.losses}L ({player_result.wins / games:.0%})\n[Profile](https://www.warzone.com/Profile?p={player_result.id})",
+                inline=False,
+            )
+        await interaction.response.send_message(embed=embed)
+
+    @player.autocomplete("player")
+    async def player_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        if not current:
+            return []
+        player_index = await self.bot.get_player_index()
+        return [
+            app_commands.Choice(name=player_result.name[0:100], value=str(player_result.id))
+            for player_result in player_index.search(current, limit=25)
+        ]
+
     @app_commands.command(name="link", description="returns the google sheets link")
     async def link(self, interaction: discord.Interaction):
         await interaction.response.send_message(
@@ -183,6 +287,27 @@ class NCComands(commands.Cog):
         print(f"Synced {len(synced)} command(s).")
         await ctx.send(f"Synced {len(synced)} command(s).")
 
+    @commands.command(name="requeue")
+    async def requeue(self, ctx: commands.Context):
+        if ctx.author.id not in ADMIN_USER_IDS:
+            return
+        requeued = await self.bot.run_blocking(self.bot.finished_game_queue.requeue)
+        await ctx.send(f"Requeued {requeued} game(s) that failed to post")
+        await self.bot.post_finished_games()
+
+    @commands.command(name="rebuild")
+    async def rebuild(self, ctx: commands.Context):
+        if ctx.author.id not in ADMIN_USER_IDS:
+            return
+        if not self.bot.parse_games:
+            await ctx.send(
+                "pgames is not hosted by the bot, run `python main.py pgames --rebuild` instead"
+            )
+            return
+        await ctx.send("Rebuilding the player standings after the current pgames run")
+        await self.bot.parse_games_job(rebuild=True)
+        await ctx.send("Rebuilt the player standings")
+
     @commands.command(name="reboot")
     async def reboot(self, ctx):
         await ctx.send("Restarting rpi")
@@ -196,209 +321,326 @@ class NCComands(commands.Cog):
 
 
 class NationsCupBot(commands.Bot):
+    # Discord's limit on embeds in a single message
+    MAX_EMBEDS_PER_MESSAGE = 10
 
     def __init__(self, *, config: Dict, **options: Any) -> None:
         super().__init__(command_prefix="nc!", intents=intents, **options)
         self.config = config
         self.jobs_scheduled = False
+        self.finished_game_queue = FinishedGameQueue(
+            config.get("finished_game_queue_path", "data/finished_games.db"),
+            config.get("finished_game_socket_path", "data/finished_games.sock"),
+        )
+        # Only one drain of the queue at a time so that a game is never posted twice
+        self.posting_lock = asyncio.Lock()
+        self.background_tasks = set()
+        # Log lines are written by a single worker thread, in order, instead of on the event loop
+        self.log_executor = ThreadPoolExecutor(max_workers=1)
+        self.max_post_attempts = int(config.get("max_post_attempts", 5))
+        self.post_retry_delay_minutes = float(config.get("post_retry_delay_minutes", 5))
+        # Worker thread calls slower than this are logged
+        self.worker_time_warning = (
+            float(config.get("worker_time_warning_ms", 1000)) / 1000
+        )
+        self.finished_game_retention_days = int(
+            config.get("finished_game_retention_days", 30)
+        )
+        self.reaction_semaphore = asyncio.Semaphore(
+            int(config.get("max_concurrent_reactions", 4))
+        )
+        self.season_store = SeasonStore(
+            config.get("season_store_path", "data/season.db")
+        )
+        # season store table -> (revision, index built from the table)
+        self.indexes: Dict[str, Tuple[int, Any]] = {}
+        # Sheets and WZ API clients stay warm between runs when the bot hosts pgames
+        self.parse_games = ParseGames(config) if config.get("pgames_in_bot") else None
+        self.parse_games_lock = asyncio.Lock()
+        # phase -> fingerprint of the last rendered fields and the standings message, so unchanged phases are not edited
+        self.embed_fingerprints: Dict[str, str] = {}
+        self.embed_messages: Dict[str, discord.Message] = {}
+
+    def log(self, msg: str, type: str = "bot"):
+        """
+        Queues a log line for the log writer thread, since `log_message` writes to the log file.
+        """
+        self.log_executor.submit(log_message, msg, type)
+
+    def log_error(self, msg: Exception | str):
+        """
+        Queues an error for the log writer thread. The traceback is formatted here, while the exception is being handled.
+        """
+        self.log_executor.submit(log_exception, msg, traceback.format_exc())
+
+    async def run_blocking(self, func: Callable, *args) -> Any:
+        """
+        Runs blocking file, database or decoding work on a worker thread so that the gateway heartbeat is not delayed.
+
+        Returns the result of `func`. Calls that take longer than `worker_time_warning_ms` are logged, the event loop
+        itself is not blocked meanwhile (see `monitor_event_loop_lag`).
+        """
+        start = time.perf_counter()
+        try:
+            return await asyncio.to_thread(func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            if elapsed > self.worker_time_warning:
+                self.log(
+                    f"{func.__qualname__} took {elapsed * 1000:.1f}ms on a worker thread",
+                    "bot.run_blocking",
+                )
+
+    async def monitor_event_loop_lag(self):
+        """
+        Logs whenever the event loop was blocked for longer than `loop_lag_warning_ms`.
+        """
+        threshold = float(self.config.get("loop_lag_warning_ms", 250)) / 1000
+        interval = 1.0
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = time.perf_counter() - start - interval
+            if lag > threshold:
+                self.log(
+                    f"Event loop was blocked for {lag * 1000:.0f}ms",
+                    "bot.monitor_event_loop_lag",
+                )
+
+    async def parse_games_job(self, rebuild: bool = False):
+        """
+        Runs ParseGames on a worker thread. A run that is due while the previous one is still going is skipped, while a
+        rebuild (see `nc!rebuild`) waits for it to finish.
+        """
+        if self.parse_games_lock.locked() and not rebuild:
+            self.log(
+                "Skipping ParseGames, the previous run has not finished",
+                "bot.parse_games_job",
+            )
+            return
+        async with self.parse_games_lock:
+            await self.run_blocking(self.parse_games.run, rebuild, False)
+
+    async def get_index(self, table: str, load: Callable[[SeasonStore], Any]) -> Any:
+        """
+        Returns the index built from a season store table, which is only rebuilt when ParseGames has written the table.
+        """
+        revision = await self.run_blocking(self.season_store.get_revision, table)
+        if table not in self.indexes or self.indexes[table][0] != revision:
+            self.indexes[table] = (
+                revision,
+                await self.run_blocking(load, self.season_store),
+            )
+        return self.indexes[table][1]
+
+    async def get_standings_index(self) -> StandingsIndex:
+        return await self.get_index(
+            SeasonStore.TEAM_TABLE_RESULTS, StandingsIndex.load
+        )
+
+    async def get_player_index(self) -> PlayerIndex:
+        return await self.get_index(SeasonStore.PLAYER_RESULTS, PlayerIndex.load)
 
     async def post_game_updates_job(self):
         """
-        Read the buffer newly finished game file and post games to discord. Clears the buffer file after completion.
+        Fallback for missed wake-ups: posts any queued games and refreshes the standings embeds.
+        """
+        self.log("Running post_game_updates_job", "bot")
+        await self.post_finished_games()
+        await self.update_standings_embeds()
+
+    async def compact_finished_game_queue_job(self):
+        """
+        Deletes the posted games that are older than `finished_game_retention_days` from the finished game queue.
+        """
+        deleted = await self.run_blocking(
+            self.finished_game_queue.compact, self.finished_game_retention_days
+        )
+        self.log(f"Deleted {deleted} posted games from the finished game queue", "bot")
+
+    def on_queue_notification(self, kind: str):
+        """
+        Called by the finished game queue listener when ParseGames wakes the bot up.
+        """
+        if kind == FinishedGameQueue.GAMES:
+            task = asyncio.create_task(self.post_finished_games())
+        elif kind == FinishedGameQueue.STANDINGS:
+            task = asyncio.create_task(self.update_standings_embeds())
+        else:
+            return
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def post_finished_games(self):
         """
+        Posts the queued finished games to discord. Games are acknowledged as soon as their message is posted, so only
+        unposted games are read on the next drain. Games that fail stay queued and are retried up to `max_post_attempts` times,
+        waiting `post_retry_delay_minutes` (doubled after every failure) between attempts. `nc!requeue` retries them again.
 
-        # Post the games that have finished since the last time we checked
-        log_message("Running post_game_updates_job", "bot")
-        with open(
-            f"data/newly_finished_games.json", "r", encoding="utf-8"
-        ) as input_file:
-            buffer_newly_finished_games: Dict[str, List[WarzoneGame]] = (
-                jsonpickle.decode(json.load(input_file))
+        With `batch_game_posts` enabled, the games of a round-group are packed into messages of up to 10 embeds.
+        """
+        async with self.posting_lock:
+            pending_games = await self.run_blocking(
+                self.finished_game_queue.pending, self.max_post_attempts
             )
+            if not pending_games:
+                return
 
             discord_channel = self.get_channel(int(self.config["game_log_channel"]))
-            successfully_posted, total = 0, 0
-            for key, games in buffer_newly_finished_games.items():
-                print(f"{len(games)} games in {key} to post")
-                round, group = key.split("-")
-                for game in games:
-                    total += 1
+            batch_size = (
+                NationsCupBot.MAX_EMBEDS_PER_MESSAGE
+                if self.config.get("batch_game_posts")
+                else 1
+            )
+
+            # round-group -> (message ID, embed, True if CAN won) in the order the games were queued
+            round_group_embeds: Dict[str, List[Tuple[int, discord.Embed, bool]]] = {}
+            for message_id, key, game in pending_games:
+                self.log(f"GAME: {game}", "build_game_embed")
+                try:
+                    embed, is_can_win = build_game_embed(key, game)
+                    round_group_embeds.setdefault(key, []).append(
+                        (message_id, embed, is_can_win)
+                    )
+                except Exception as e:
+                    self.log_error(f"Error while handling game {game.link}: {e}")
+                    await self.record_post_failure([message_id], e)
+
+            successfully_posted = 0
+            celebrated_messages: List[discord.Message] = []
+            for key, embeds in round_group_embeds.items():
+                for start in range(0, len(embeds), batch_size):
+                    batch = embeds[start : start + batch_size]
                     try:
-                        winners = [x for x in game.players if x.id in game.winner]
-                        losers = [x for x in game.players if x.id not in game.winner]
-                        log_message(f"GAME: {game}", "post_game_updates_job")
-                        print(winners)
-                        print(losers)
-                        embed = discord.Embed(
-                            title=f"{', '.join([p.name for p in winners])} defeats {', '.join([p.name for p in losers])}"[
-                                0:256
-                            ],
-                            description=f"[Game Link]({game.link})"[0:4096],
-                            colour=ROUND_TO_COLOUR[round],
+                        sent_message = await discord_channel.send(
+                            embeds=[embed for _, embed, _ in batch]
                         )
-                        embed.add_field(
-                            name=f"{round} {ROUND_TO_TEMPLATE[round]} - {group}"[0:256],
-                            value=f"**{winners[0].team}** ({winners[0].score:g} pts) defeats **{losers[0].team}** ({losers[0].score:g} pts)"[
-                                0:1024
-                            ],
-                        )
-                        # embed.set_footer(
-                        #     text=f"{winners[0].team} {winners[0].score:g} - {losers[0].team} {losers[0].score:g}"[
-                        #         0:2048
-                        #     ]
-                        # )
-                        sent_embed = await discord_channel.send(embed=embed)
-
-                        if "CAN" in winners[0].team:
-                            await sent_embed.add_reaction("🇨🇦")
-                            await sent_embed.add_reaction("🎉")
-                            # await sent_embed.add_reaction("🇨")
-                            # await sent_embed.add_reaction("🇦")
-                            # await sent_embed.add_reaction("🇳")
-                            # await sent_embed.add_reaction("🍁")
-                            # await sent_embed.add_reaction("🦫")
-                        successfully_posted += 1
                     except Exception as e:
-                        log_exception(f"Error while handling game {game.link}: {e}")
-        # Update embeds now:
-        with open("data/team_standings.json", "r", encoding="utf-8") as input_file:
-            team_standings: Dict[str, TableTeamResult] = jsonpickle.decode(
-                json.load(input_file)
-            )
-
-            discord_channel = self.get_channel(int(self.config["score_channel"]))
-            for phase, embed in ROUND_TO_EMBED.items():
-                if embed != 0:
-                    group_standings: Dict[str, List[TableTeamResult]] = {}
-                    phase_standings = [
-                        ps for ps in team_standings.items() if phase in ps[0]
-                    ]
-                    for key, team_result in phase_standings:
-                        group_standings.setdefault(key.split("-")[1], []).append(
-                            team_result
+                        self.log_error(f"Error while posting games in {key}: {e}")
+                        await self.record_post_failure(
+                            [message_id for message_id, _, _ in batch], e
                         )
+                        continue
 
-                    message = await discord_channel.fetch_message(embed)
-                    embed = message.embeds[0]
-                    if phase == "Finals":
-                        embed.description = (
-                            "Each stage is best of 13 (first to 7 wins):"
-                        )
-                    embed.clear_fields()
-                    for i, (group, team_results) in enumerate(group_standings.items()):
-                        if (
-                            (phase == "Main" or phase == "Finals")
-                            and i % 2 == 0
-                            and i != 0
-                        ):
-                            embed.add_field(
-                                name="\u200b",
-                                value="\u200b",
-                                inline=True,
-                            )
-                        if phase == "Qualifiers":
-                            total_games = (
-                                (len(set([result.team for result in team_results])) - 1)
-                                * 6
-                                * 2
-                            )
-                        elif phase == "Finals":
-                            # each round is separate
-                            total_games = 13
-                        else:
-                            total_games = 30
-                        team_scores: Dict[str, Tuple[str, float, float, int]] = {}
-                        for result in team_results:
-                            if result.team not in team_scores:
-                                # team_scores[result.team] = (result.team, result.wins_adjusted, result.wins, result.losses, result.wins+result.losses)
-                                team_scores[result.team] = (
-                                    result.team,
-                                    result.wins_adjusted,
-                                    result.wins_adjusted
-                                    - result.wins
-                                    - result.losses
-                                    - result.unstarted_games
-                                    + total_games,
-                                    result.losses,
-                                )
-                            else:
-                                scores = team_scores[result.team]
-                                # team_scores[result.team] = (scores[0], scores[1]+result.wins_adjusted, scores[2]+result.wins, scores[3]+result.losses, scores[4]+result.wins+result.losses)
-                                team_scores[result.team] = (
-                                    scores[0],
-                                    scores[1] + result.wins_adjusted,
-                                    scores[2]
-                                    + result.wins_adjusted
-                                    - result.wins
-                                    - result.losses
-                                    - result.unstarted_games,
-                                    scores[3] + result.losses,
-                                )
-                        team_scores_list = list(team_scores.values())
-                        team_scores_list.sort(key=lambda e: (e[1], e[2]), reverse=True)
-
-                        if phase == "Qualifiers":
-                            team_results_str = "\n".join(
-                                [
-                                    f"{e[0]:5}|{e[1]:4g}|{e[2]:4g}"
-                                    for e in team_scores_list
-                                ]
-                            )
-                        elif phase == "Finals":
-                            team_results_str = f"  Team  | Pts\n"
-                            team_results_str += "\n".join(
-                                [
-                                    f"{format_finals_round_results(e)}{e[0]:5} | {e[1]:2g}"
-                                    for e in team_scores_list
-                                ]
-                            )
-                        else:
-                            team_results_str = "\n".join(
-                                [
-                                    f"{e[0]:5} | {e[1]:2g} | {e[2]:2g}"
-                                    for e in team_scores_list
-                                ]
-                            )
-                        embed.add_field(
-                            name=group,
-                            value=f"```{team_results_str}```"[0:1024],
-                            inline=True,
-                        )
-                    if phase == "Finals":
-                        embed.add_field(
-                            name="\u200b",
-                            value="\u200b",
-                            inline=True,
-                        )
-                    embed.add_field(name="\u200b", value="\u200b")
-                    embed.timestamp = datetime.now()
-                    await message.edit(embed=embed)
-                    log_message(f"Successfully updated the embed for {phase}")
+                    await self.run_blocking(
+                        self.finished_game_queue.ack,
+                        [message_id for message_id, _, _ in batch],
+                    )
+                    successfully_posted += len(batch)
+                    if any(is_can_win for _, _, is_can_win in batch):
+                        celebrated_messages.append(sent_message)
 
-        log_message(
-            f"Successfully outputted {successfully_posted} of {total} game updates",
-            "bot",
+            # Reactions are not needed to mark a game as posted, so they are added concurrently once every game is out
+            await asyncio.gather(
+                *[self.add_celebration(message) for message in celebrated_messages]
+            )
+
+            self.log(
+                f"Successfully outputted {successfully_posted} of {len(pending_games)} game updates",
+                "bot",
+            )
+
+    async def record_post_failure(self, message_ids: List[int], error: Exception):
+        attempts = await self.run_blocking(
+            self.finished_game_queue.record_failure,
+            message_ids,
+            repr(error),
+            self.post_retry_delay_minutes,
         )
+        if attempts >= self.max_post_attempts:
+            self.log(
+                f"Giving up on queued games {message_ids} after {attempts} attempts, use nc!requeue to post them again",
+                "bot.record_post_failure",
+            )
 
-        if successfully_posted:
-            with open(
-                f"data/newly_finished_games.json", "w", encoding="utf-8"
-            ) as output_file:
-                # Reset the buffer file
-                log_message(
-                    "Resetting the buffer file after posting game updates", "bot"
-                )
-                json.dump(jsonpickle.encode({}), output_file)
+    async def add_celebration(self, message: discord.Message):
+        """
+        Reacts to a CAN win. At most `max_concurrent_reactions` messages are reacted to at once, discord.py waits out
+        any rate limit on the reaction endpoint.
+        """
+        async with self.reaction_semaphore:
+            try:
+                for reaction in ["🇨🇦", "🎉"]:
+                    await message.add_reaction(reaction)
+            except Exception as e:
+                self.log_error(f"Unable to add reactions to message {message.id}: {e}")
+
+    async def update_standings_embeds(self):
+        """
+        Rebuilds the per-phase standings embeds from the season store. Phases whose fields did not change since the last
+        update are skipped without calling discord.
+        """
+        standings_index = await self.get_standings_index()
+        if not standings_index.groups:
+            return
+
+        discord_channel = self.get_channel(int(self.config["score_channel"]))
+        for phase, embed_id in ROUND_TO_EMBED.items():
+            if embed_id == 0:
+                continue
+
+            description, fields = render_standings_fields(phase, standings_index)
+            fingerprint = get_embed_fingerprint(description, fields)
+            if self.embed_fingerprints.get(phase) == fingerprint:
+                continue
+
+            try:
+                message = self.embed_messages.get(phase)
+                if message is None:
+                    message = await discord_channel.fetch_message(embed_id)
+                    self.embed_messages[phase] = message
+                embed = message.embeds[0].copy()
+                if fingerprint == get_embed_fingerprint(
+                    embed.description if description is not None else None,
+                    [(field.name, field.value, field.inline) for field in embed.fields],
+                ):
+                    # Already up to date (ie. after a restart)
+                    self.embed_fingerprints[phase] = fingerprint
+                    continue
+
+                if description is not None:
+                    embed.description = description
+                embed.clear_fields()
+                for name, value, inline in fields:
+                    embed.add_field(name=name, value=value, inline=inline)
+                embed.timestamp = datetime.now()
+                self.embed_messages[phase] = await message.edit(embed=embed)
+                self.embed_fingerprints[phase] = fingerprint
+                self.log(f"Successfully updated the embed for {phase}")
+            except Exception as e:
+                # Fetch the message again next time in case it was replaced
+                self.embed_messages.pop(phase, None)
+                self.log_error(f"Unable to update the embed for {phase}: {e}")
 
     async def on_ready(self):
         await self.add_cog(NCComands(self))
         # Start schedulers (only on first run)
         if not self.jobs_scheduled:
-            log_message("Scheduled post_game_updates_job", "bot")
             self.jobs_scheduled = True
+            # Games left over by the old buffer file are posted through the queue
+            await self.run_blocking(self.finished_game_queue.import_legacy_buffer)
+            self.finished_game_queue.listen(self.on_queue_notification)
+            self.loop_lag_monitor = asyncio.create_task(self.monitor_event_loop_lag())
+            self.log("Listening for finished game notifications", "bot")
+
+            self.log("Scheduled post_game_updates_job", "bot")
             scheduler = AsyncIOScheduler()
             scheduler.add_job(
                 self.post_game_updates_job,
-                CronTrigger(hour="*", minute="*/5", second="0"),
+                CronTrigger(hour="*", minute="*/30", second="0"),
+            )
+            scheduler.add_job(
+                self.compact_finished_game_queue_job,
+                CronTrigger(hour="4", minute="15", second="0"),
             )
+            if self.parse_games:
+                self.log("Scheduled parse_games_job", "bot")
+                scheduler.add_job(
+                    self.parse_games_job,
+                    CronTrigger(hour="*", minute="0,30", second="0"),
+                    max_instances=1,
+                    coalesce=True,
+                )
             scheduler.start()
+            # Post whatever was queued while the bot was offline
+            await self.post_game_updates_job()
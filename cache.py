@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+import json
+import os
+from threading import Lock
+from typing import Dict, Tuple
+
+from NCTypes import Game, WarzoneGame
+import serializer
+from utils import log_message
+
+
+class GameCache:
+    """
+    On-disk cache of finished warzone games keyed by game ID.
+
+    Finished games never change, so API.check_game can answer them locally. Entries are appended
+    to a line-delimited file as they are cached; invalidating a game appends a tombstone line. The
+    file is compacted on load once it holds too many dead lines, dropping invalidated entries,
+    entries older than `max_age_days` and the oldest entries past `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str = "data/game_cache.jsonl",
+        max_entries: int = 10000,
+        max_age_days: int = 365,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = timedelta(days=max_age_days)
+        self.lock = Lock()
+        # game ID -> (cached at, encoded game; a jsonpickle string for entries cached before the serializer)
+        self.entries: Dict[str, Tuple[str, Dict | str]] = {}
+        self.load()
+
+    def load(self):
+        self.entries = {}
+        if not os.path.isfile(self.path):
+            return
+
+        line_count = 0
+        with open(self.path, "r", encoding="utf-8") as input_file:
+            for line in input_file:
+                if not line.strip():
+                    continue
+                line_count += 1
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written line from an interrupted run
+                    continue
+                if entry.get("invalidated"):
+                    self.entries.pop(entry["id"], None)
+                else:
+                    self.entries[entry["id"]] = (entry["cached_at"], entry["game"])
+
+        oldest_allowed = (datetime.now() - self.max_age).isoformat()
+        expired = [
+            game_id
+            for game_id, (cached_at, _) in self.entries.items()
+            if cached_at < oldest_allowed
+        ]
+        for game_id in expired:
+            self.entries.pop(game_id)
+
+        if (
+            expired
+            or len(self.entries) > self.max_entries
+            or line_count > 2 * len(self.entries) + 100
+        ):
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrites the cache file with only the live entries, evicting the oldest past `max_entries`.
+        """
+        with self.lock:
+            if len(self.entries) > self.max_entries:
+                newest = sorted(
+                    self.entries.items(), key=lambda e: e[1][0], reverse=True
+                )[: self.max_entries]
+                self.entries = dict(newest)
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as output_file:
+                for game_id, (cached_at, game) in self.entries.items():
+                    output_file.write(
+                        json.dumps({"id": game_id, "cached_at": cached_at, "game": game})
+                        + "\n"
+                    )
+            os.replace(tmp_path, self.path)
+        log_message(
+            f"Compacted the game cache to {len(self.entries)} games", "GameCache"
+        )
+
+    def get(self, game_id: str) -> WarzoneGame | None:
+        """
+        Returns a fresh copy of the cached game, or None if the game is not cached.
+        """
+        entry = self.entries.get(str(game_id))
+        return serializer.decode(entry[1], "warzone_game") if entry else None
+
+    def put(self, game_id: str, game: WarzoneGame):
+        """
+        Caches the game if it is in a terminal state. Other games are ignored.
+        """
+        if game.outcome != Game.Outcome.FINISHED:
+            return
+
+        entry = {
+            "id": str(game_id),
+            "cached_at": datetime.now().isoformat(),
+            "game": serializer.encode("warzone_game", game),
+        }
+        with self.lock:
+            self.entries[entry["id"]] = (entry["cached_at"], entry["game"])
+            self.append(entry)
+
+    def invalidate(self, game_id: str) -> bool:
+        """
+        Removes a game from the cache so that it is queried from the WZ API again.
+
+        Returns True if the game was cached.
+        """
+        with self.lock:
+            if self.entries.pop(str(game_id), None) is None:
+                return False
+            self.append({"id": str(game_id), "invalidated": True})
+            return True
+
+    def append(self, entry: Dict):
+        with open(self.path, "a", encoding="utf-8") as output_file:
+            output_file.write(json.dumps(entry) + "\n")
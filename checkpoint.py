@@ -0,0 +1,73 @@
+import json
+import os
+from threading import Lock
+from typing import Dict
+
+from utils import log_message
+
+
+class GameCreationCheckpoint:
+    """
+    Append-only record of the games created by CreateGames that are not written to the sheet yet.
+
+    Every game ID is flushed to disk as soon as the WZ API returns it, so a run that crashes before writing the links
+    back to the sheet can be re-run without creating the same games again.
+    """
+
+    def __init__(self, path: str = "data/create_games_checkpoint.jsonl"):
+        self.path = path
+        self.lock = Lock()
+        # matchup key -> game ID
+        self.games: Dict[str, str] = {}
+        self.load()
+
+    @staticmethod
+    def get_key(tab: str, row: int, player_a_id: int, player_b_id: int) -> str:
+        return f"{tab}|{row}|{player_a_id}|{player_b_id}"
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as input_file:
+            for line in input_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written line from a crash
+                    continue
+                self.games[entry["key"]] = entry["game_id"]
+        if self.games:
+            log_message(
+                f"Resuming with {len(self.games)} games created by a previous run",
+                "GameCreationCheckpoint.load",
+            )
+
+    def get(self, key: str) -> str | None:
+        return self.games.get(key)
+
+    def record(self, key: str, game_id: str):
+        with self.lock:
+            self.games[key] = game_id
+            with open(self.path, "a", encoding="utf-8") as output_file:
+                output_file.write(json.dumps({"key": key, "game_id": game_id}) + "\n")
+                output_file.flush()
+                os.fsync(output_file.fileno())
+
+    def clear_tab(self, tab: str):
+        """
+        Drops the games of a tab once their links are safely written to the sheet.
+        """
+        with self.lock:
+            self.games = {
+                key: game_id
+                for key, game_id in self.games.items()
+                if not key.startswith(f"{tab}|")
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as output_file:
+                for key, game_id in self.games.items():
+                    output_file.write(
+                        json.dumps({"key": key, "game_id": game_id}) + "\n"
+                    )
+            os.replace(tmp_path, self.path)
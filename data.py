@@ -20,3 +20,6 @@ CGAMES_TAB_TO_TABLE_RANGE_MAPPING = {
 
 UNKNOWN_PLAYER_NAME = "<no player>"
 NO_GAME_PLAYED = "<>"
+
+# Teams of a country are named "<country> <division letter>" (ie. "CAN A"), teams that do not follow it are mapped here
+TEAM_TO_COUNTRY = {}
@@ -0,0 +1,249 @@
+import asyncio
+from datetime import datetime, timedelta
+import os
+import socket
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+from NCTypes import WarzoneGame
+import serializer
+from utils import log_message
+
+
+class FinishedGameQueue:
+    """
+    Queue of newly finished games between ParseGames (producer) and the discord bot (consumer).
+
+    Games are stored in SQLite so that they survive restarts of either side, and each game link can only be queued once.
+    The consumer acknowledges every game after posting it, so each game is posted exactly once. A game that fails to post
+    is held back for an exponentially growing delay, so repeated wake-ups do not use up its attempts, and can be put back
+    with `requeue` once it was given up on. Producers wake the bot through a unix datagram socket instead of the bot
+    polling for new games. Consumed games are deleted by `compact` once they are older than the retention period.
+    """
+
+    GAMES = "games"
+    STANDINGS = "standings"
+
+    def __init__(
+        self,
+        path: str = "data/finished_games.db",
+        socket_path: str = "data/finished_games.sock",
+    ):
+        self.path = path
+        self.socket_path = socket_path
+        self.listener: socket.socket | None = None
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS finished_games (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    link TEXT NOT NULL UNIQUE,
+                    round_group TEXT NOT NULL,
+                    game TEXT NOT NULL,
+                    enqueued_at TEXT NOT NULL,
+                    consumed_at TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    next_attempt_at TEXT
+                )
+                """
+            )
+            # Queues created before failed posts were tracked
+            columns = [
+                column[1]
+                for column in conn.execute("PRAGMA table_info(finished_games)")
+            ]
+            if "attempts" not in columns:
+                conn.execute(
+                    "ALTER TABLE finished_games ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0"
+                )
+                conn.execute("ALTER TABLE finished_games ADD COLUMN last_error TEXT")
+            # Queues created before failed posts were backed off
+            if "next_attempt_at" not in columns:
+                conn.execute(
+                    "ALTER TABLE finished_games ADD COLUMN next_attempt_at TEXT"
+                )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS finished_games_pending ON finished_games (consumed_at, id)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        # Sync the write-ahead log on every commit so that a queued game survives a crash or power loss
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def put(self, round_group: str, games: List[WarzoneGame]) -> int:
+        """
+        Queues the finished games of a round/group. Games that were already queued are ignored.
+
+        Returns the number of newly queued games.
+        """
+        with self.connect() as conn:
+            queued = conn.executemany(
+                "INSERT OR IGNORE INTO finished_games (link, round_group, game, enqueued_at) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        game.link,
+                        round_group,
+                        serializer.dumps("warzone_game", game),
+                        datetime.now().isoformat(),
+                    )
+                    for game in games
+                ],
+            ).rowcount
+        conn.close()
+        return queued
+
+    def pending(self, max_attempts: int | None = None) -> List[Tuple[int, str, WarzoneGame]]:
+        """
+        Returns the games that have not been consumed yet, in the order they were queued, as (message ID, round-group, game).
+
+        Games that already failed `max_attempts` times or are waiting out their retry delay are left out.
+        """
+        with self.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, round_group, game FROM finished_games
+                WHERE consumed_at IS NULL AND attempts < ? AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                ORDER BY id
+                """,
+                (
+                    max_attempts if max_attempts is not None else 2**31,
+                    datetime.now().isoformat(),
+                ),
+            ).fetchall()
+        conn.close()
+        return [
+            (message_id, round_group, serializer.loads(game, "warzone_game"))
+            for message_id, round_group, game in rows
+        ]
+
+    def ack(self, message_ids: List[int]):
+        """
+        Marks games as consumed so that they are never handed out again.
+        """
+        consumed_at = datetime.now().isoformat()
+        with self.connect() as conn:
+            conn.executemany(
+                "UPDATE finished_games SET consumed_at = ? WHERE id = ?",
+                [(consumed_at, message_id) for message_id in message_ids],
+            )
+        conn.close()
+
+    def record_failure(
+        self, message_ids: List[int], error: str, retry_delay_minutes: float = 5
+    ) -> int:
+        """
+        Records a failed attempt to consume games. The games stay queued and are handed out again once the retry delay
+        has passed, which doubles with every failed attempt (5, 10, 20... minutes by default).
+
+        Returns the highest number of attempts among the games.
+        """
+        now = datetime.now()
+        placeholders = ",".join("?" * len(message_ids))
+        with self.connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, attempts FROM finished_games WHERE id IN ({placeholders})",
+                message_ids,
+            ).fetchall()
+            conn.executemany(
+                "UPDATE finished_games SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                [
+                    (
+                        attempts + 1,
+                        error,
+                        (
+                            now + timedelta(minutes=retry_delay_minutes * 2**attempts)
+                        ).isoformat(),
+                        message_id,
+                    )
+                    for message_id, attempts in rows
+                ],
+            )
+        conn.close()
+        return max((attempts + 1 for _, attempts in rows), default=0)
+
+    def requeue(self) -> int:
+        """
+        Resets the attempts of every unconsumed game that failed to post, including the games that were given up on, so
+        they are handed out on the next drain.
+
+        Returns the number of requeued games.
+        """
+        with self.connect() as conn:
+            requeued = conn.execute(
+                "UPDATE finished_games SET attempts = 0, next_attempt_at = NULL WHERE consumed_at IS NULL AND attempts > 0"
+            ).rowcount
+        conn.close()
+        return requeued
+
+    def compact(self, retention_days: int) -> int:
+        """
+        Deletes the games consumed more than `retention_days` ago and truncates the write-ahead log. A deleted game can be
+        queued again, so the retention must be longer than a finished game could be re-checked by ParseGames.
+
+        Returns the number of deleted games.
+        """
+        consumed_before = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self.connect() as conn:
+            deleted = conn.execute(
+                "DELETE FROM finished_games WHERE consumed_at IS NOT NULL AND consumed_at < ?",
+                (consumed_before,),
+            ).rowcount
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        return deleted
+
+    def import_legacy_buffer(self, buffer_path: str = "data/newly_finished_games.json"):
+        """
+        Moves the games left in the old jsonpickle buffer file into the queue and resets the file.
+        """
+        if not os.path.isfile(buffer_path):
+            return
+        buffer_newly_finished_games: Dict[str, List[WarzoneGame]] = serializer.load(
+            buffer_path, "finished_games"
+        )
+        if not buffer_newly_finished_games:
+            return
+
+        for round_group, games in buffer_newly_finished_games.items():
+            self.put(round_group, games)
+        log_message(
+            f"Imported {sum(len(games) for games in buffer_newly_finished_games.values())} games from {buffer_path}",
+            "FinishedGameQueue",
+        )
+        serializer.dump("finished_games", {}, buffer_path)
+
+    def notify(self, kind: str):
+        """
+        Wakes the consumer. Does nothing if the bot is not listening (it reads the queue when it starts).
+        """
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.sendto(kind.encode(), self.socket_path)
+        except OSError:
+            pass
+
+    def listen(self, on_notify: Callable[[str], None]):
+        """
+        Binds the notification socket on the running event loop and calls `on_notify` with the kind of every notification.
+        """
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.listener.bind(self.socket_path)
+        self.listener.setblocking(False)
+
+        def read_notifications():
+            while True:
+                try:
+                    kind = self.listener.recv(64).decode()
+                except BlockingIOError:
+                    return
+                on_notify(kind)
+
+        asyncio.get_running_loop().add_reader(
+            self.listener.fileno(), read_notifications
+        )
@@ -0,0 +1,171 @@
+import json
+import os
+from typing import Dict, Iterable, Set, Tuple
+
+from NCTypes import PlayerResult
+from utils import log_message
+
+# (player id, player name, team)
+LedgerPlayer = Tuple[int, str, str]
+
+
+class StandingsLedger:
+    """
+    Persisted record of every finished game that has been folded into the player standings for the season, keyed by game link.
+
+    ParseGames only folds in games that are missing from the ledger (or whose players or result changed), so finished rows do not
+    need to be re-parsed every run. The running player totals are stored alongside the games.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str = "data/standings_ledger.json"):
+        self.path = path
+        # game key -> (left player, right player, True if the left player won)
+        self.games: Dict[str, Tuple[LedgerPlayer, LedgerPlayer, bool]] = {}
+        self.players: Dict[int, PlayerResult] = {}
+        # IDs of the players whose totals changed since `pop_changed_players` was last called
+        self.changed_players: Set[int] = set()
+        # Modification time of the file when it was last loaded or saved
+        self.mtime: float | None = None
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+
+        self.mtime = os.path.getmtime(self.path)
+
+        with open(self.path, "r", encoding="utf-8") as input_file:
+            ledger = json.load(input_file)
+        if ledger.get("version") != StandingsLedger.VERSION:
+            log_message(
+                f"Ignoring standings ledger with unknown version {ledger.get('version')}",
+                "StandingsLedger.load",
+            )
+            return
+
+        self.games = {
+            key: (tuple(left), tuple(right), left_won)
+            for key, (left, right, left_won) in ledger["games"].items()
+        }
+        for player in ledger["players"]:
+            player_result = PlayerResult(player["name"], player["id"], player["team"])
+            player_result.wins = player["wins"]
+            player_result.losses = player["losses"]
+            self.players[player["id"]] = player_result
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as output_file:
+            json.dump(
+                {
+                    "version": StandingsLedger.VERSION,
+                    "games": self.games,
+                    "players": [
+                        {
+                            "id": player.id,
+                            "name": player.name,
+                            "team": player.team,
+                            "wins": player.wins,
+                            "losses": player.losses,
+                        }
+                        for player in self.players.values()
+                    ],
+                },
+                output_file,
+            )
+        os.replace(tmp_path, self.path)
+        self.mtime = os.path.getmtime(self.path)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the ledger if its file was written by another process (ie. `pgames --rebuild` while the bot hosts pgames)
+        since it was loaded, so that the next save does not overwrite it.
+
+        Returns True if the ledger was reloaded.
+        """
+        mtime = os.path.getmtime(self.path) if os.path.isfile(self.path) else None
+        if mtime == self.mtime:
+            return False
+        self.clear()
+        self.mtime = None
+        self.load()
+        self.changed_players.update(self.players)
+        return True
+
+    def clear(self):
+        """
+        Drops every game and player total so that the standings are rebuilt from the sheet.
+        """
+        self.changed_players.update(self.players)
+        self.games = {}
+        self.players = {}
+
+    def has_game(
+        self, key: str, left: LedgerPlayer, right: LedgerPlayer, left_won: bool
+    ) -> bool:
+        """
+        Returns True if the game is already folded into the standings with the same players and result. Only the player
+        IDs are compared since the names from the sheet and from the WZ API can differ.
+        """
+        if key not in self.games:
+            return False
+        stored_left, stored_right, stored_left_won = self.games[key]
+        return (stored_left[0], stored_right[0], stored_left_won) == (
+            left[0],
+            right[0],
+            left_won,
+        )
+
+    def record_game(
+        self, key: str, left: LedgerPlayer, right: LedgerPlayer, left_won: bool
+    ):
+        """
+        Folds a finished game into the player totals. A game already in the ledger with a different result is replaced.
+        """
+        if key in self.games:
+            if self.games[key] == (left, right, left_won):
+                return
+            self.remove_game(key)
+
+        self.games[key] = (left, right, left_won)
+        winner, loser = (left, right) if left_won else (right, left)
+        self.get_player(winner).wins += 1
+        self.get_player(loser).losses += 1
+        self.changed_players.update((winner[0], loser[0]))
+
+    def remove_game(self, key: str):
+        left, right, left_won = self.games.pop(key)
+        winner, loser = (left, right) if left_won else (right, left)
+        self.players[winner[0]].wins -= 1
+        self.players[loser[0]].losses -= 1
+        self.changed_players.update((winner[0], loser[0]))
+        for player_id in (winner[0], loser[0]):
+            if not self.players[player_id].wins and not self.players[player_id].losses:
+                self.players.pop(player_id)
+
+    def prune(self, seen_keys: Iterable[str]):
+        """
+        Removes the games that no longer exist in the sheet (ie. rows that were removed by hand).
+        """
+        seen_keys = set(seen_keys)
+        for key in [key for key in self.games if key not in seen_keys]:
+            log_message(
+                f"Removing game {key} from the standings ledger", "StandingsLedger.prune"
+            )
+            self.remove_game(key)
+
+    def get_player(self, player: LedgerPlayer) -> PlayerResult:
+        player_id, name, team = player
+        return self.players.setdefault(player_id, PlayerResult(name, player_id, team))
+
+    def pop_changed_players(self) -> Set[int]:
+        """
+        Returns the IDs of the players whose totals changed (or who were removed) since the last call.
+        """
+        changed_players, self.changed_players = self.changed_players, set()
+        return changed_players
+
+    def player_results(self) -> Dict[int, PlayerResult]:
+        return dict(self.players)
@@ -5,6 +5,7 @@ import json
 import sys
 
 import jsonpickle
+from cache import GameCache
 from CreateGames import CreateGames
 
 from CreateMatches import CreateMatches
@@ -12,6 +13,7 @@ from CreateMatches import CreateMatches
 # from GetFunStats import GetFunStats
 from GetFunStats import GetFunStats
 from ParseGames import ParseGames
+import serializer
 
 # from ParsePlayers import ParsePlayers
 from ValidatePlayers import ValidatePlayers
@@ -52,6 +54,11 @@ cmatches.add_argument("output", help="Output sheet tab name")
 cgames = subparsers.add_parser("cgames", help="Create Warzone games from matchups")
 
 pgames = subparsers.add_parser("pgames", help="Parse games and update google sheets")
+pgames.add_argument(
+    "--rebuild",
+    action="store_true",
+    help="Recount the player standings from every finished game in the sheet (use after editing results by hand)",
+)
 validate_results = subparsers.add_parser(
     "validate_results", help="Validates player/team scores by parsing games again"
 )
@@ -64,6 +71,11 @@ setup = subparsers.add_parser(
 bot = subparsers.add_parser(
     "bot", help="Initializes the discord bot and hourly job to post new game updates"
 )
+bot.add_argument(
+    "--pgames",
+    action="store_true",
+    help="Run pgames every half-hour inside the bot instead of from cron",
+)
 
 validate = subparsers.add_parser(
     "validate",
@@ -74,6 +86,30 @@ funstats = subparsers.add_parser(
     "funstats", help="aggregates all games and outputs stats to a file"
 )
 
+gamecache = subparsers.add_parser(
+    "gamecache", help="Manage the local cache of finished games"
+)
+gamecache.add_argument(
+    "--invalidate",
+    nargs="+",
+    metavar="GAME_ID",
+    help="Game IDs to remove from the cache so they are queried again",
+)
+gamecache.add_argument(
+    "--compact",
+    action="store_true",
+    help="Rewrite the cache file with only the live entries",
+)
+migrate = subparsers.add_parser(
+    "migrate", help="Convert jsonpickle data files to the versioned data format"
+)
+migrate.add_argument(
+    "paths",
+    nargs="*",
+    default=["data"],
+    help="Files or directories to convert (default: data, including data/NC2023 and data/NC2024)",
+)
+
 parser.add_argument(
     "-e",
     "--email",
@@ -101,16 +137,24 @@ if args.token:
     config["token"] = args.token
 config["dryrun"] = args.dryrun
 
-if config["email"] is None and args.cmd in ["cgames", "pgames"]:
+if args.cmd == "bot" and args.pgames:
+    config["pgames_in_bot"] = True
+runs_pgames = args.cmd == "pgames" or config.get("pgames_in_bot")
+
+if config["email"] is None and (args.cmd == "cgames" or runs_pgames):
     parser.error("-e/--email is required if no config is present")
-if config["token"] is None and args.cmd in ["cgames", "pgames"]:
+if config["token"] is None and (args.cmd == "cgames" or runs_pgames):
     parser.error("-t/--token is required if no config is present")
-if config["spreadsheet_id"] is None and args.cmd in [
-    "cmatches",
-    "cgames",
-    "pgames",
-    "pplayers",
-]:
+if config["spreadsheet_id"] is None and (
+    args.cmd
+    in [
+        "cmatches",
+        "cgames",
+        "pgames",
+        "pplayers",
+    ]
+    or runs_pgames
+):
     parser.error("-s/--spreadsheet_id is required if no config is present")
 
 config["run"] = args.run
@@ -128,7 +172,7 @@ elif args.cmd == "cgames":
     create_games.run()
 elif args.cmd == "pgames":
     parse_games = ParseGames(config)
-    parse_games.run()
+    parse_games.run(args.rebuild)
 elif args.cmd == "setup":
     print(
         f"Running setup to create a config.json file locally. This will allow you to run commands without needing to input the warzone email and API token every time. Note that everything is stored locally and no data is sent anywhere."
@@ -157,6 +201,39 @@ elif args.cmd == "validate_results":
 elif args.cmd == "funstats":
     fun_stats = GetFunStats(config)
     fun_stats.run()
+elif args.cmd == "gamecache":
+    game_cache = GameCache(config.get("game_cache_path", "data/game_cache.jsonl"))
+    for game_id in args.invalidate or []:
+        if game_cache.invalidate(game_id):
+            print(f"Invalidated game {game_id}")
+        else:
+            print(f"Game {game_id} is not cached")
+    if args.compact:
+        game_cache.compact()
+    print(f"{len(game_cache.entries)} games cached")
+elif args.cmd == "migrate":
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, name)
+                    for name in sorted(names)
+                    if name.endswith(".json")
+                )
+        else:
+            files.append(path)
+    for file in files:
+        try:
+            result = serializer.migrate_file(file, config["dryrun"])
+        except Exception as e:
+            print(f"{file}: unable to convert ({e!r})")
+            continue
+        if result:
+            kind, old_size, new_size = result
+            print(f"{file}: {kind} {old_size} -> {new_size} bytes")
+        else:
+            print(f"{file}: skipped (already migrated or not a supported data file)")
 # elif args.cmd == "test":
 #     test = TestCommand(config)
 #     test.run()
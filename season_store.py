@@ -0,0 +1,359 @@
+from datetime import datetime
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+from NCTypes import Game, PlayerResult, TableTeamResult, WarzoneGame
+from sheet_rows import parse_game_id
+
+
+class SeasonStore:
+    """
+    Local SQLite copy of the season: every game checked by ParseGames, the player results and the team table results.
+
+    ParseGames writes to it as it goes, so the bot and the stats commands can query the season without reading the sheet,
+    the WZ API or the JSON data files. Every write bumps the revision of its table, which readers use to tell if it changed.
+    """
+
+    GAMES = "games"
+    PLAYER_RESULTS = "player_results"
+    TEAM_TABLE_RESULTS = "team_table_results"
+
+    # Sheet status of the lobby games deleted by ParseGames, which are given a winner like a finished game
+    DELETED_STATUS = "Deleted"
+
+    GAME_COLUMNS = [
+        "link",
+        "game_id",
+        "tab",
+        "round",
+        "group_name",
+        "player_a_id",
+        "player_a_name",
+        "player_a_team",
+        "player_b_id",
+        "player_b_name",
+        "player_b_team",
+        "winner_id",
+        "outcome",
+        "status",
+        "turns",
+        "start_time",
+        "updated_at",
+    ]
+
+    def __init__(self, path: str = "data/season.db"):
+        self.path = path
+        with self.connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS games (
+                    link TEXT PRIMARY KEY,
+                    game_id TEXT NOT NULL,
+                    tab TEXT NOT NULL,
+                    round TEXT NOT NULL,
+                    group_name TEXT NOT NULL,
+                    player_a_id INTEGER NOT NULL,
+                    player_a_name TEXT NOT NULL,
+                    player_a_team TEXT NOT NULL,
+                    player_b_id INTEGER NOT NULL,
+                    player_b_name TEXT NOT NULL,
+                    player_b_team TEXT NOT NULL,
+                    winner_id INTEGER,
+                    outcome TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    turns INTEGER,
+                    start_time TEXT,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS games_by_tab ON games (tab, outcome);
+                CREATE INDEX IF NOT EXISTS games_by_group ON games (round, group_name);
+                CREATE INDEX IF NOT EXISTS games_by_player_a ON games (player_a_id);
+                CREATE INDEX IF NOT EXISTS games_by_player_b ON games (player_b_id);
+
+                CREATE TABLE IF NOT EXISTS player_results (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    team TEXT NOT NULL,
+                    wins INTEGER NOT NULL,
+                    losses INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS player_results_by_team ON player_results (team);
+
+                CREATE TABLE IF NOT EXISTS team_table_results (
+                    key TEXT PRIMARY KEY,
+                    round TEXT NOT NULL,
+                    group_name TEXT NOT NULL,
+                    team TEXT NOT NULL,
+                    wins_adjusted REAL NOT NULL,
+                    wins INTEGER NOT NULL,
+                    losses INTEGER NOT NULL,
+                    unstarted_games INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS team_table_results_by_group ON team_table_results (round, group_name);
+
+                CREATE TABLE IF NOT EXISTS revisions (
+                    table_name TEXT PRIMARY KEY,
+                    revision INTEGER NOT NULL
+                );
+                """
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO revisions (table_name, revision) VALUES (?, 0)",
+                [
+                    (SeasonStore.GAMES,),
+                    (SeasonStore.PLAYER_RESULTS,),
+                    (SeasonStore.TEAM_TABLE_RESULTS,),
+                ],
+            )
+            # Stores written before deleted games were stored as finished
+            conn.execute(
+                "UPDATE games SET outcome = ? WHERE status = ? AND winner_id IS NOT NULL",
+                (Game.Outcome.FINISHED.value, SeasonStore.DELETED_STATUS),
+            )
+        conn.close()
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def bump_revision(conn: sqlite3.Connection, table: str):
+        conn.execute(
+            "UPDATE revisions SET revision = revision + 1 WHERE table_name = ?",
+            (table,),
+        )
+
+    def get_revision(self, table: str) -> int:
+        """
+        Returns a number that changes every time the table is written.
+        """
+        with self.connect() as conn:
+            revision = conn.execute(
+                "SELECT revision FROM revisions WHERE table_name = ?", (table,)
+            ).fetchone()[0]
+        conn.close()
+        return revision
+
+    @staticmethod
+    def get_game_row(
+        tab: str, group: str, game: WarzoneGame, status: str
+    ) -> Dict[str, str | int | None]:
+        """
+        Returns the games table row of a game checked through the WZ API. The players must already be in sheet order.
+        A deleted lobby game is stored as finished with the winner ParseGames picked, the same as when it is read back
+        from the sheet by `get_finished_game_row`.
+        """
+        outcome = (
+            Game.Outcome.FINISHED
+            if status == SeasonStore.DELETED_STATUS and game.winner
+            else game.outcome
+        )
+        return {
+            "link": game.link,
+            "game_id": parse_game_id(game.link),
+            "tab": tab,
+            "round": tab[1:],
+            "group_name": group,
+            "player_a_id": int(game.players[0].id),
+            "player_a_name": game.players[0].name,
+            "player_a_team": game.players[0].team,
+            "player_b_id": int(game.players[1].id),
+            "player_b_name": game.players[1].name,
+            "player_b_team": game.players[1].team,
+            "winner_id": int(game.winner[0]) if game.winner else None,
+            "outcome": outcome.value,
+            "status": status,
+            "turns": game.round,
+            "start_time": game.start_time.isoformat(),
+            "updated_at": datetime.now().isoformat(),
+        }
+
+    @staticmethod
+    def get_finished_game_row(
+        tab: str,
+        group: str,
+        link: str,
+        left: Tuple[int, str, str],
+        right: Tuple[int, str, str],
+        is_left_won: bool,
+        status: str,
+    ) -> Dict[str, str | int | None]:
+        """
+        Returns the games table row of a game that was already finished in the sheet. Players are given as (id, name, team).
+        The turns and start time are unknown since the game is not checked through the WZ API.
+        """
+        return {
+            "link": link,
+            "game_id": parse_game_id(link),
+            "tab": tab,
+            "round": tab[1:],
+            "group_name": group,
+            "player_a_id": left[0],
+            "player_a_name": left[1],
+            "player_a_team": left[2],
+            "player_b_id": right[0],
+            "player_b_name": right[1],
+            "player_b_team": right[2],
+            "winner_id": left[0] if is_left_won else right[0],
+            "outcome": Game.Outcome.FINISHED.value,
+            "status": status,
+            "turns": None,
+            "start_time": None,
+            "updated_at": datetime.now().isoformat(),
+        }
+
+    def put_games(self, rows: List[Dict], replace: bool = True):
+        """
+        Stores games (see `get_game_row`). With `replace=False` games that are already stored are left untouched.
+        """
+        if not rows:
+            return
+        columns = ", ".join(SeasonStore.GAME_COLUMNS)
+        values = ", ".join(f":{column}" for column in SeasonStore.GAME_COLUMNS)
+        with self.connect() as conn:
+            conn.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO games ({columns}) VALUES ({values})",
+                rows,
+            )
+            SeasonStore.bump_revision(conn, SeasonStore.GAMES)
+        conn.close()
+
+    def put_player_results(
+        self, player_results: Dict[int, PlayerResult], player_ids: Iterable[int]
+    ):
+        """
+        Updates the given players from `player_results`. Players missing from `player_results` are removed.
+        """
+        player_ids = list(player_ids)
+        if not player_ids:
+            return
+        with self.connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO player_results (id, name, team, wins, losses) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET name = excluded.name, team = excluded.team, wins = excluded.wins, losses = excluded.losses
+                """,
+                [
+                    (
+                        player.id,
+                        player.name,
+                        player.team,
+                        player.wins,
+                        player.losses,
+                    )
+                    for player in (
+                        player_results[player_id]
+                        for player_id in player_ids
+                        if player_id in player_results
+                    )
+                ],
+            )
+            conn.executemany(
+                "DELETE FROM player_results WHERE id = ?",
+                [
+                    (player_id,)
+                    for player_id in player_ids
+                    if player_id not in player_results
+                ],
+            )
+            SeasonStore.bump_revision(conn, SeasonStore.PLAYER_RESULTS)
+        conn.close()
+
+    def put_team_table_results(self, team_table_results: Dict[str, TableTeamResult]):
+        """
+        Replaces the team table results. Existing rows keep their position so the groups are read back in sheet order.
+        """
+        with self.connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO team_table_results (key, round, group_name, team, wins_adjusted, wins, losses, unstarted_games)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET wins_adjusted = excluded.wins_adjusted, wins = excluded.wins,
+                    losses = excluded.losses, unstarted_games = excluded.unstarted_games
+                """,
+                [
+                    (
+                        key,
+                        result.round,
+                        result.group,
+                        result.team,
+                        result.wins_adjusted,
+                        result.wins,
+                        result.losses,
+                        result.unstarted_games,
+                    )
+                    for key, result in team_table_results.items()
+                ],
+            )
+            stored_keys = [
+                key for (key,) in conn.execute("SELECT key FROM team_table_results")
+            ]
+            conn.executemany(
+                "DELETE FROM team_table_results WHERE key = ?",
+                [(key,) for key in stored_keys if key not in team_table_results],
+            )
+            SeasonStore.bump_revision(conn, SeasonStore.TEAM_TABLE_RESULTS)
+        conn.close()
+
+    def get_team_table_results(self) -> Dict[str, TableTeamResult]:
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT key, round, group_name, team, wins_adjusted, wins, losses, unstarted_games FROM team_table_results ORDER BY rowid"
+            ).fetchall()
+        conn.close()
+
+        team_table_results: Dict[str, TableTeamResult] = {}
+        for key, round, group, team, wins_adjusted, wins, losses, unstarted in rows:
+            result = TableTeamResult(round, group, team, wins_adjusted, wins, losses)
+            result.unstarted_games = unstarted
+            team_table_results[key] = result
+        return team_table_results
+
+    def get_player_count(self) -> int:
+        with self.connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM player_results").fetchone()[0]
+        conn.close()
+        return count
+
+    def get_player_results(self) -> Dict[int, PlayerResult]:
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT id, name, team, wins, losses FROM player_results"
+            ).fetchall()
+        conn.close()
+
+        player_results: Dict[int, PlayerResult] = {}
+        for player_id, name, team, wins, losses in rows:
+            player_result = PlayerResult(name, player_id, team)
+            player_result.wins = wins
+            player_result.losses = losses
+            player_results[player_id] = player_result
+        return player_results
+
+    def get_games(
+        self,
+        tab: str | None = None,
+        outcome: str | None = None,
+        player_id: int | None = None,
+    ) -> List[sqlite3.Row]:
+        """
+        Returns the stored games matching every given filter, in the order they were first stored.
+        """
+        conditions, parameters = [], []
+        if tab is not None:
+            conditions.append("tab = ?")
+            parameters.append(tab)
+        if outcome is not None:
+            conditions.append("outcome = ?")
+            parameters.append(outcome)
+        if player_id is not None:
+            conditions.append("(player_a_id = ? OR player_b_id = ?)")
+            parameters.extend([player_id, player_id])
+
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"SELECT * FROM games {'WHERE ' + ' AND '.join(conditions) if conditions else ''} ORDER BY rowid",
+                parameters,
+            ).fetchall()
+        conn.close()
+        return rows
@@ -0,0 +1,334 @@
+from datetime import datetime
+import json
+import os
+from typing import Any, Callable, Dict, Tuple
+
+import jsonpickle
+
+from NCTypes import (
+    CountryResult,
+    Game,
+    PlayerResult,
+    RoundResult,
+    TableTeamResult,
+    TeamResult,
+    WarzoneGame,
+    WarzonePlayer,
+)
+
+# Bump when a field is added, renamed or removed, and convert the older versions in `decode`
+VERSION = 1
+
+# Classes that were renamed since the jsonpickle files were written
+LEGACY_CLASS_NAMES = {"NCTypes.GameResult": "NCTypes.RoundResult"}
+
+
+class UnsupportedDataException(Exception):
+    pass
+
+
+def encode_warzone_player(player: WarzonePlayer) -> Dict:
+    return {
+        "name": player.name,
+        "id": player.id,
+        "team": player.team,
+        "score": player.score,
+        "outcome": player.outcome.value,
+    }
+
+
+def decode_warzone_player(data: Dict) -> WarzonePlayer:
+    player = WarzonePlayer(data["name"], data["id"], data["outcome"], data["team"])
+    player.score = data["score"]
+    return player
+
+
+def encode_warzone_game(game: WarzoneGame) -> Dict:
+    return {
+        "players": [encode_warzone_player(player) for player in game.players],
+        "outcome": game.outcome.value,
+        "winner": game.winner,
+        "link": game.link,
+        "start_time": game.start_time.isoformat(),
+        "round": game.round,
+    }
+
+
+def decode_warzone_game(data: Dict) -> WarzoneGame:
+    game = WarzoneGame(
+        [decode_warzone_player(player) for player in data["players"]],
+        Game.Outcome(data["outcome"]),
+        data["link"],
+        datetime.fromisoformat(data["start_time"]),
+        data["round"],
+    )
+    game.winner = data["winner"]
+    return game
+
+
+def encode_table_team_result(result: TableTeamResult) -> Dict:
+    return {
+        "round": result.round,
+        "group": result.group,
+        "team": result.team,
+        "wins_adjusted": result.wins_adjusted,
+        "wins": result.wins,
+        "losses": result.losses,
+        # Missing from results unpickled from files written before it was added
+        "unstarted_games": getattr(result, "unstarted_games", 0),
+    }
+
+
+def decode_table_team_result(data: Dict) -> TableTeamResult:
+    result = TableTeamResult(
+        data["round"],
+        data["group"],
+        data["team"],
+        data["wins_adjusted"],
+        data["wins"],
+        data["losses"],
+    )
+    result.unstarted_games = data["unstarted_games"]
+    return result
+
+
+def encode_player_result(result: PlayerResult) -> Dict:
+    return {
+        "name": result.name,
+        "id": result.id,
+        "team": result.team,
+        "wins": result.wins,
+        "losses": result.losses,
+    }
+
+
+def decode_player_result(data: Dict) -> PlayerResult:
+    result = PlayerResult(data["name"], data["id"], data["team"])
+    result.wins = data["wins"]
+    result.losses = data["losses"]
+    return result
+
+
+def encode_round_result(result: RoundResult) -> Dict:
+    return {
+        "opp": result.opp,
+        "pts_for": result.pts_for,
+        "pts_against": result.pts_against,
+        "wins": result.wins,
+        "losses": result.losses,
+        "total": result.total,
+    }
+
+
+def decode_round_result(data: Dict) -> RoundResult:
+    result = RoundResult(data["opp"], data["pts_for"], data["pts_against"])
+    result.wins = data["wins"]
+    result.losses = data["losses"]
+    result.total = data["total"]
+    return result
+
+
+def encode_team_result(result: TeamResult) -> Dict:
+    return {
+        "name": result.name,
+        "players": [encode_player_result(player) for player in result.players],
+        "round_wins": result.round_wins,
+        "round_losses": result.round_losses,
+        "games_result": {
+            round: encode_round_result(round_result)
+            for round, round_result in result.games_result.items()
+        },
+    }
+
+
+def decode_team_result(data: Dict) -> TeamResult:
+    result = TeamResult(data["name"])
+    result.players = [decode_player_result(player) for player in data["players"]]
+    result.round_wins = data["round_wins"]
+    result.round_losses = data["round_losses"]
+    result.games_result = {
+        round: decode_round_result(round_result)
+        for round, round_result in data["games_result"].items()
+    }
+    return result
+
+
+def encode_country_result(result: CountryResult) -> Dict:
+    return {"name": result.name, "wins": result.wins, "losses": result.losses}
+
+
+def decode_country_result(data: Dict) -> CountryResult:
+    result = CountryResult(data["name"])
+    result.wins = data["wins"]
+    result.losses = data["losses"]
+    return result
+
+
+def encode_dict(encode: Callable[[Any], Dict]) -> Callable[[Dict], Dict]:
+    return lambda values: {key: encode(value) for key, value in values.items()}
+
+
+def decode_dict(decode: Callable[[Dict], Any]) -> Callable[[Dict], Dict]:
+    return lambda values: {key: decode(value) for key, value in values.items()}
+
+
+# kind -> (encoder, decoder) of everything stored in a data file
+KINDS: Dict[str, Tuple[Callable[[Any], Any], Callable[[Any], Any]]] = {
+    "warzone_game": (encode_warzone_game, decode_warzone_game),
+    # round-group -> games
+    "finished_games": (
+        lambda games: {
+            key: [encode_warzone_game(game) for game in round_games]
+            for key, round_games in games.items()
+        },
+        lambda games: {
+            key: [decode_warzone_game(game) for game in round_games]
+            for key, round_games in games.items()
+        },
+    ),
+    # round-group-team -> table result
+    "team_standings": (
+        encode_dict(encode_table_team_result),
+        decode_dict(decode_table_team_result),
+    ),
+    # country -> country result
+    "country_standings": (
+        encode_dict(encode_country_result),
+        decode_dict(decode_country_result),
+    ),
+    # (team -> team result, player ID -> player result)
+    "standings": (
+        lambda standings: [
+            encode_dict(encode_team_result)(standings[0]),
+            encode_dict(encode_player_result)(standings[1]),
+        ],
+        lambda standings: (
+            decode_dict(decode_team_result)(standings[0]),
+            decode_dict(decode_player_result)(standings[1]),
+        ),
+    ),
+}
+
+
+def encode(kind: str, value: Any) -> Dict:
+    """
+    Returns the versioned plain JSON representation of a value.
+    """
+    return {"version": VERSION, "kind": kind, "data": KINDS[kind][0](value)}
+
+
+def decode(data: Dict | str, kind: str | None = None) -> Any:
+    """
+    Returns the value stored by `encode`. Values written by jsonpickle (including the double encoded files) are decoded
+    with jsonpickle.
+
+    Raises an UnsupportedDataException if the data is newer than this version or is not of the expected kind.
+    """
+    if is_legacy(data):
+        return decode_legacy(data)
+
+    if data["version"] > VERSION:
+        raise UnsupportedDataException(
+            f"Data version {data['version']} is newer than the supported version {VERSION}"
+        )
+    if kind and data["kind"] != kind:
+        raise UnsupportedDataException(f"Expected {kind} data, found {data['kind']}")
+    return KINDS[data["kind"]][1](data["data"])
+
+
+def dumps(kind: str, value: Any) -> str:
+    return json.dumps(encode(kind, value), separators=(",", ":"))
+
+
+def loads(text: str, kind: str | None = None) -> Any:
+    return decode(json.loads(text), kind)
+
+
+def dump(kind: str, value: Any, path: str):
+    """
+    Writes a value to a data file, replacing the file only once it is fully written.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as output_file:
+        output_file.write(dumps(kind, value))
+    os.replace(tmp_path, path)
+
+
+def load(path: str, kind: str | None = None) -> Any:
+    with open(path, "r", encoding="utf-8") as input_file:
+        return loads(input_file.read(), kind)
+
+
+def is_legacy(data: Any) -> bool:
+    """
+    Returns True if the data was written by jsonpickle, either double encoded (a JSON string) or not.
+    """
+    return isinstance(data, str) or "version" not in data
+
+
+def decode_legacy(data: Any) -> Any:
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    for old_name, new_name in LEGACY_CLASS_NAMES.items():
+        data = data.replace(f'"{old_name}"', f'"{new_name}"')
+    return jsonpickle.decode(data)
+
+
+def get_legacy_kind(value: Any) -> str | None:
+    """
+    Returns the kind of a decoded jsonpickle value, or None if it is not one of the supported kinds.
+    """
+    if isinstance(value, WarzoneGame):
+        return "warzone_game"
+    if isinstance(value, tuple) and len(value) == 2:
+        teams, players = value
+        if all(isinstance(team, TeamResult) for team in teams.values()) and all(
+            isinstance(player, PlayerResult) for player in players.values()
+        ):
+            return "standings"
+    if isinstance(value, dict) and value:
+        values = list(value.values())
+        if all(isinstance(result, TableTeamResult) for result in values):
+            return "team_standings"
+        if all(
+            isinstance(games, list)
+            and all(isinstance(game, WarzoneGame) for game in games)
+            for games in values
+        ):
+            return "finished_games"
+    return None
+
+
+def migrate_file(path: str, dryrun: bool = False) -> Tuple[str, int, int] | None:
+    """
+    Rewrites a jsonpickle data file in the versioned format. The original is kept next to it as `<path>.jsonpickle`.
+
+    Returns (kind, old size, new size) or None if the file is already migrated or does not hold a supported kind.
+    """
+    with open(path, "r", encoding="utf-8") as input_file:
+        text = input_file.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, (str, dict)) or not is_legacy(data):
+        return None
+
+    # Plain JSON that was never pickled (ie. games_with_chat.json) has no supported kind
+    value = decode_legacy(data)
+    # An empty buffer has no objects to tell its kind from
+    kind = (
+        "finished_games"
+        if value == {} and "newly_finished_games" in os.path.basename(path)
+        else get_legacy_kind(value)
+    )
+    if kind is None:
+        return None
+
+    new_text = dumps(kind, value)
+    if not dryrun:
+        os.replace(path, f"{path}.jsonpickle")
+        with open(path, "w", encoding="utf-8") as output_file:
+            output_file.write(new_text)
+    return kind, len(text.encode()), len(new_text.encode())
+
@@ -1,17 +1,36 @@
 from __future__ import print_function
 
 from enum import Enum
+import json
 import os.path
 import re
-from typing import List
+from typing import Dict, List
 
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build, Resource
 from googleapiclient.errors import HttpError
 
+from utils import log_exception
+
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
 
+def column_to_index(column: str) -> int:
+    index = 0
+    for letter in column:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def index_to_column(index: int) -> str:
+    column = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        column = chr(ord("A") + remainder) + column
+    return column
+
+
 class GoogleSheet:
 
     class TabStatus(Enum):
@@ -32,8 +51,14 @@ class GoogleSheet:
                 case _:
                     return GoogleSheet.TabStatus.NOT_STARTED
 
+    # Spreadsheet ID -> tab statuses, shared by every GoogleSheet in the process
+    tab_status_cache: Dict[str, Dict[str, TabStatus]] = {}
+
     def __init__(self, config):
         self.dryrun = "dryrun" in config and config["dryrun"]
+        # Range updates waiting to be sent in a single batchUpdate by flush_updates
+        self.pending_updates: List[Dict] = []
+        self.max_pending_updates = int(config.get("sheet_write_batch_size", 500))
         creds = None
         # The file token.json stores the user's access and refresh tokens, and is
         # created automatically when the authorization flow completes for the first
@@ -78,6 +103,35 @@ class GoogleSheet:
         except:
             return []
 
+    def get_rows_batch(self, ranges: List[str], formulas=False) -> Dict[str, List[List[str]]]:
+        """
+        Reads every range in a single batchGet request. Formulas are returned instead of the formatted values if `formulas` is set.
+
+        Returns a dictionary of range -> rows. Ranges without values map to an empty list. A failed request (ie. quota
+        or permissions) is logged and raised, so that callers never mistake it for empty tabs.
+        """
+        ranges = list(dict.fromkeys(ranges))
+        if not ranges:
+            return {}
+        try:
+            value_ranges = (
+                self.sheet.values() # type: ignore
+                .batchGet(
+                    spreadsheetId=self.spreadsheet_id,
+                    ranges=ranges,
+                    valueRenderOption="FORMULA" if formulas else "FORMATTED_VALUE",
+                )
+                .execute()["valueRanges"]
+            )
+            # Value ranges are returned in the same order as requested
+            return {
+                range: value_range.get("values", [])
+                for range, value_range in zip(ranges, value_ranges)
+            }
+        except HttpError as err:
+            log_exception(f"Unable to read {len(ranges)} ranges: {err}")
+            raise
+
     def update_rows_raw(self, range, data):
         if self.dryrun:
             print("Running dryun on update_rows_raw and not updating sheet")
@@ -93,8 +147,84 @@ class GoogleSheet:
                 .execute()
             )
 
+    def queue_update(self, range, data):
+        """
+        Buffers an update to a range. Pending updates are sent together by flush_updates, which is called automatically once `max_pending_updates` ranges are waiting.
+        """
+        self.pending_updates.append({"range": range, "values": data})
+        if len(self.pending_updates) >= self.max_pending_updates:
+            self.flush_updates()
+
+    def queue_changed_cells(self, sheet_range, original, data):
+        """
+        Buffers only the cells of `data` that differ from `original` (the rows as they were read from the sheet).
+        Changed cells are grouped into rectangular blocks of contiguous changes, so untouched cells are never rewritten.
+        """
+        tab, start_column, start_row = re.search(
+            r"^(.*)!([A-Z]+)(\d+)", sheet_range
+        ).groups()
+        start_column, start_row = column_to_index(start_column), int(start_row)
+
+        # (first column, last column) -> [first row, last row, values] for blocks still being extended
+        open_blocks: Dict[tuple, list] = {}
+        blocks = []
+        for i, row in enumerate(data):
+            original_row = original[i] if i < len(original) else []
+            spans = []
+            span_start = None
+            for j in range(max(len(row), len(original_row)) + 1):
+                new_value = row[j] if j < len(row) else ""
+                old_value = original_row[j] if j < len(original_row) else ""
+                changed = str(new_value) != str(old_value)
+                if changed and span_start is None:
+                    span_start = j
+                elif not changed and span_start is not None:
+                    spans.append((span_start, j - 1))
+                    span_start = None
+
+            for span in list(open_blocks):
+                if span not in spans:
+                    blocks.append((span, *open_blocks.pop(span)))
+            for span in spans:
+                values = [row[j] if j < len(row) else "" for j in range(span[0], span[1] + 1)]
+                if span in open_blocks:
+                    open_blocks[span][1] = i
+                    open_blocks[span][2].append(values)
+                else:
+                    open_blocks[span] = [i, i, [values]]
+        blocks.extend((span, *block) for span, block in open_blocks.items())
+
+        for (first_column, last_column), first_row, last_row, values in blocks:
+            self.queue_update(
+                f"{tab}!{index_to_column(start_column + first_column)}{start_row + first_row}:"
+                f"{index_to_column(start_column + last_column)}{start_row + last_row}",
+                values,
+            )
+
+    def flush_updates(self):
+        """
+        Sends every pending range update in one batchUpdate request.
+        """
+        if not self.pending_updates:
+            return
+        updates, self.pending_updates = self.pending_updates, []
+        if self.dryrun:
+            print(
+                f"Running dryrun on flush_updates and not updating sheet with {len(updates)} ranges:"
+            )
+            print(json.dumps(updates, indent=4, default=str))
+        else:
+            return (
+                self.sheet.values() # type: ignore
+                .batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={"valueInputOption": "USER_ENTERED", "data": updates},
+                )
+                .execute()
+            )
+
     def get_sheet_tabs_data(self):
-        return self.sheet.get(spreadsheetId=self.spreadsheet_id).execute().get("sheets") # type: ignore
+        return self.sheet.get(spreadsheetId=self.spreadsheet_id, fields="sheets.properties.title").execute().get("sheets") # type: ignore
 
     def get_game_tabs(self) -> List[str]:
         """
@@ -109,14 +239,32 @@ class GoogleSheet:
                 game_tabs.append(tab["properties"]["title"])
         return game_tabs
 
-    def get_tab_status(self, tab: str) -> TabStatus:
-        tab_status = self.get_rows(f"{tab}!A1")
+    def get_tab_statuses(self, refresh=False) -> Dict[str, TabStatus]:
+        """
+        Reads the status cell (A1) of every game tab in one batched request. The result is cached for the rest of the process unless `refresh` is set.
 
-        try:
-            return GoogleSheet.TabStatus.from_string(tab_status[0][0])
-        except IndexError:
-            return GoogleSheet.TabStatus.NOT_STARTED
+        Returns a dictionary of tab -> status.
+        """
+        if refresh or self.spreadsheet_id not in GoogleSheet.tab_status_cache:
+            tabs = self.get_game_tabs()
+            status_cells = self.get_rows_batch([f"{tab}!A1" for tab in tabs])
+            tab_statuses = {}
+            for tab in tabs:
+                try:
+                    tab_statuses[tab] = GoogleSheet.TabStatus.from_string(
+                        status_cells[f"{tab}!A1"][0][0]
+                    )
+                except IndexError:
+                    tab_statuses[tab] = GoogleSheet.TabStatus.NOT_STARTED
+            GoogleSheet.tab_status_cache[self.spreadsheet_id] = tab_statuses
+        return GoogleSheet.tab_status_cache[self.spreadsheet_id]
+
+    def get_tab_status(self, tab: str) -> TabStatus:
+        return self.get_tab_statuses().get(tab, GoogleSheet.TabStatus.NOT_STARTED)
 
-    def get_tabs_by_status(self, status: List["GoogleSheet.TabStatus"]) -> List[str]:
-        tabs = self.get_game_tabs()
-        return [tab for tab in tabs if self.get_tab_status(tab) in status]
+    def get_tabs_by_status(self, status: List["GoogleSheet.TabStatus"], refresh=False) -> List[str]:
+        return [
+            tab
+            for tab, tab_status in self.get_tab_statuses(refresh).items()
+            if tab_status in status
+        ]
@@ -0,0 +1,216 @@
+from enum import IntEnum
+import re
+from typing import List
+
+
+class GameColumn(IntEnum):
+    """
+    Columns of the game range of a tab (see `TAB_TO_GAME_RANGE_MAPPING`). Matchup rows reuse the player columns for the
+    teams and their scores, and mark the game link column "done" once cgames has read them.
+    """
+
+    GROUP = 0
+    PLAYER_A = 1
+    PLAYER_A_LINK = 2
+    RESULT = 3
+    PLAYER_B = 4
+    PLAYER_B_LINK = 5
+    GAME_LINK = 6
+    STATUS = 7
+    TEMPLATE = 8
+
+
+GAME_ROW_WIDTH = len(GameColumn)
+
+TAB_PHASE_REGEX = re.compile(r"^(_\w+)")
+PLAYER_ID_REGEX = re.compile(r"p=(\d+)")
+GAME_ID_REGEX = re.compile(r"GameID=(\d+)")
+
+
+def get_tab_phase(tab: str) -> str:
+    """
+    Returns the phase prefix of a tab (ie. "_Main R1" -> "_Main").
+    """
+    return TAB_PHASE_REGEX.search(tab).group(1)
+
+
+def parse_player_id(link: str) -> int | None:
+    """
+    Returns the player ID of a WZ profile link, or None if it is not a profile link.
+    """
+    player_id = PLAYER_ID_REGEX.search(link)
+    return int(player_id.group(1)) if player_id else None
+
+
+def parse_game_id(link: str) -> str | None:
+    """
+    Returns the game ID of a WZ game link, or None if it is not a game link.
+    """
+    game_id = GAME_ID_REGEX.search(link)
+    return game_id.group(1) if game_id else None
+
+
+class MatchupRow:
+    """
+    The row starting a matchup between two teams. Reads and writes go through to the raw sheet row.
+    """
+
+    __slots__ = ("index", "row", "group", "team_a", "team_b")
+
+    def __init__(self, index: int, row: List[str], group: str):
+        self.index = index
+        self.row = row
+        self.group = group
+        self.team_a = row[GameColumn.PLAYER_A].strip()
+        self.team_b = row[GameColumn.PLAYER_B].strip()
+
+    @property
+    def score_a(self) -> int:
+        return int(self.row[GameColumn.PLAYER_A_LINK])
+
+    @property
+    def score_b(self) -> int:
+        return int(self.row[GameColumn.PLAYER_B_LINK])
+
+    def record_win(self, is_team_a_won: bool):
+        """
+        Adds a game won to the score of team A or team B.
+        """
+        if is_team_a_won:
+            self.row[GameColumn.PLAYER_A_LINK] = self.score_a + 1
+        else:
+            self.row[GameColumn.PLAYER_B_LINK] = self.score_b + 1
+
+    def mark_done(self):
+        """
+        Marks the matchup as read by cgames.
+        """
+        self.row[GameColumn.GAME_LINK] = "done"
+
+
+class GameRow:
+    """
+    A game between two players of a matchup. The player and game IDs are parsed once, reads and writes go through to the
+    raw sheet row so that the tab can be written back as is.
+    """
+
+    __slots__ = (
+        "index",
+        "row",
+        "group",
+        "matchup",
+        "player_a_id",
+        "player_b_id",
+        "game_id",
+    )
+
+    def __init__(
+        self, index: int, row: List[str], group: str, matchup: MatchupRow | None
+    ):
+        self.index = index
+        self.row = row
+        self.group = group
+        self.matchup = matchup
+        self.player_a_id = parse_player_id(row[GameColumn.PLAYER_A_LINK])
+        self.player_b_id = parse_player_id(row[GameColumn.PLAYER_B_LINK])
+        self.game_id = parse_game_id(row[GameColumn.GAME_LINK])
+
+    @property
+    def team_a(self) -> str:
+        return self.matchup.team_a if self.matchup else ""
+
+    @property
+    def team_b(self) -> str:
+        return self.matchup.team_b if self.matchup else ""
+
+    @property
+    def player_a(self) -> str:
+        return self.row[GameColumn.PLAYER_A].strip()
+
+    @property
+    def player_b(self) -> str:
+        return self.row[GameColumn.PLAYER_B].strip()
+
+    @property
+    def result(self) -> str:
+        return self.row[GameColumn.RESULT]
+
+    @result.setter
+    def result(self, result: str):
+        self.row[GameColumn.RESULT] = result
+
+    @property
+    def game_link(self) -> str:
+        return self.row[GameColumn.GAME_LINK].strip()
+
+    @game_link.setter
+    def game_link(self, link: str):
+        self.row[GameColumn.GAME_LINK] = link
+        self.game_id = parse_game_id(link)
+
+    @property
+    def status(self) -> str:
+        return self.row[GameColumn.STATUS]
+
+    @status.setter
+    def status(self, status: str):
+        self.row[GameColumn.STATUS] = status
+
+    @property
+    def template(self) -> str:
+        return self.row[GameColumn.TEMPLATE].strip()
+
+
+def pad_row(row: List[str]) -> List[str]:
+    """
+    Pads a raw row in place with empty cells up to the schema width, since the sheet leaves out trailing empty cells.
+    """
+    if len(row) < GAME_ROW_WIDTH:
+        row.extend([""] * (GAME_ROW_WIDTH - len(row)))
+    return row
+
+
+def parse_game_rows(rows: List[List[str]]) -> List[MatchupRow | GameRow]:
+    """
+    Parses the game range of a tab after the games were created, in sheet order. A matchup ends at an empty row or at a
+    row without a result and game link (which are left out), and the next row with a team starts a new matchup.
+    """
+    parsed_rows: List[MatchupRow | GameRow] = []
+    group, matchup = "", None
+    for i, row in enumerate(rows):
+        pad_row(row)
+        if (not row[GameColumn.GROUP] and not row[GameColumn.PLAYER_A]) or (
+            not row[GameColumn.RESULT] and not row[GameColumn.GAME_LINK]
+        ):
+            matchup = None
+            continue
+
+        if row[GameColumn.GROUP]:
+            group = row[GameColumn.GROUP]
+        if (
+            not (matchup and (matchup.team_a or matchup.team_b))
+            and row[GameColumn.PLAYER_A]
+        ):
+            matchup = MatchupRow(i, row, group)
+            parsed_rows.append(matchup)
+        else:
+            parsed_rows.append(GameRow(i, row, group, matchup))
+    return parsed_rows
+
+
+def parse_new_game_rows(rows: List[List[str]]) -> List[MatchupRow | GameRow]:
+    """
+    Parses the game range of a tab before the games are created (ie. the `cmatches` output), in sheet order. Every row
+    with a group starts a matchup and every other row with a player is a game.
+    """
+    parsed_rows: List[MatchupRow | GameRow] = []
+    group, matchup = "", None
+    for i, row in enumerate(rows):
+        pad_row(row)
+        if row[GameColumn.GROUP]:
+            group = row[GameColumn.GROUP]
+            matchup = MatchupRow(i, row, group)
+            parsed_rows.append(matchup)
+        elif row[GameColumn.PLAYER_A]:
+            parsed_rows.append(GameRow(i, row, group, matchup))
+    return parsed_rows
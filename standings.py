@@ -0,0 +1,276 @@
+from bisect import bisect_left
+import difflib
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from data import TEAM_TO_COUNTRY
+from NCTypes import CountryResult, PlayerResult, TableTeamResult
+from season_store import SeasonStore
+from sheet_rows import parse_player_id
+
+
+class TeamScore:
+    """
+    A team's totals across every round of a phase within one group.
+    """
+
+    def __init__(self, team: str):
+        self.team = team
+        self.points = 0.0
+        self.max_points = 0.0
+        self.losses = 0
+
+    def __repr__(self) -> str:
+        return f"TeamScore({self.team}, {self.points:g}, {self.max_points:g}, {self.losses})"
+
+
+class CountryStandings:
+    """
+    Wins and losses of every country and every team, summed over the team table results in a single pass.
+    """
+
+    DIVISION_SUFFIX_REGEX = re.compile(r"^(.+) [A-Z]$")
+
+    def __init__(self, team_results: Iterable[TableTeamResult]):
+        # in the order the countries and teams first appear in the results
+        self.countries: Dict[str, CountryResult] = {}
+        self.teams: Dict[str, CountryResult] = {}
+        for result in team_results:
+            country = CountryStandings.get_country(result.team)
+            for results, name in (
+                (self.countries, country),
+                (self.teams, result.team),
+            ):
+                country_result = results.setdefault(name, CountryResult(name))
+                country_result.wins += result.wins
+                country_result.losses += result.losses
+
+    @staticmethod
+    def get_country(team: str) -> str:
+        """
+        Returns the country of a team: its mapping in `TEAM_TO_COUNTRY`, otherwise the name without the division letter
+        (ie. "CAN A" -> "CAN", "HUN" -> "HUN").
+        """
+        if team in TEAM_TO_COUNTRY:
+            return TEAM_TO_COUNTRY[team]
+        division = CountryStandings.DIVISION_SUFFIX_REGEX.match(team)
+        return division.group(1) if division else team
+
+    def get(self, name: str) -> CountryResult:
+        """
+        Returns the results of a country, or of a single team if there is no country with the name (all zeroes if neither).
+        """
+        return self.countries.get(name) or self.teams.get(name) or CountryResult(name)
+
+
+class TeamTableResults:
+    """
+    Team table results of the tabs being parsed, indexed by (round, group, team), with running totals of every
+    (phase, group, team) that are updated as game results are recorded.
+    """
+
+    def __init__(self):
+        self.results: Dict[Tuple[str, str, str], TableTeamResult] = {}
+        # (phase, group, team) -> sum of the team's results in every round of the phase
+        self.phase_totals: Dict[Tuple[str, str, str], TableTeamResult] = {}
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __iter__(self) -> Iterator[TableTeamResult]:
+        return iter(self.results.values())
+
+    def add(self, result: TableTeamResult):
+        """
+        Adds the table results of a team in a round as read from the sheet. A result for the same round, group and team is replaced.
+        """
+        key = (result.round, result.group, result.team)
+        if key in self.results:
+            self.add_to_phase_totals(self.results[key], -1)
+        self.results[key] = result
+        self.add_to_phase_totals(result, 1)
+
+    def add_to_phase_totals(self, result: TableTeamResult, sign: int):
+        phase = StandingsIndex.get_phase(result.round)
+        totals = self.phase_totals.setdefault(
+            (phase, result.group, result.team),
+            TableTeamResult(phase, result.group, result.team, 0, 0, 0),
+        )
+        totals.wins_adjusted += sign * result.wins_adjusted
+        totals.wins += sign * result.wins
+        totals.losses += sign * result.losses
+
+    def get(self, round: str, group: str, team: str) -> TableTeamResult:
+        return self.results[(round, group, team)]
+
+    def record_game(self, round: str, group: str, team: str, is_won: bool):
+        """
+        Adds a finished game to the team's result in the round and to its phase totals.
+        """
+        result = self.results[(round, group, team)]
+        totals = self.phase_totals[(StandingsIndex.get_phase(round), group, team)]
+        if is_won:
+            result.wins_adjusted += 1
+            result.wins += 1
+            totals.wins_adjusted += 1
+            totals.wins += 1
+        else:
+            result.losses += 1
+            totals.losses += 1
+
+    def add_unstarted_game(self, round: str, group: str, team: str):
+        self.results[(round, group, team)].unstarted_games += 1
+
+    def get_phase_totals(self, phase: str, group: str, team: str) -> TableTeamResult:
+        """
+        Returns the sum of the team's results in every round of the phase (all zeroes if the team has none).
+        """
+        return self.phase_totals.get(
+            (phase, group, team), TableTeamResult(phase, group, team, 0, 0, 0)
+        )
+
+    def to_dict(self) -> Dict[str, TableTeamResult]:
+        """
+        Returns the results keyed by "round-group-team", as stored in `team_standings.json` and the season store.
+        """
+        return {
+            f"{round}-{group}-{team}": result
+            for (round, group, team), result in self.results.items()
+        }
+
+
+class StandingsIndex:
+    """
+    Team standings from the season store indexed by (phase, group, team), with the per-group totals used by the bot
+    embeds computed once when the standings are loaded.
+    """
+
+    def __init__(self, team_standings: Dict[str, TableTeamResult]):
+        # (phase, group, team) -> table results of every round in the phase
+        self.results: Dict[Tuple[str, str, str], List[TableTeamResult]] = {}
+        for team_result in team_standings.values():
+            self.results.setdefault(
+                (
+                    StandingsIndex.get_phase(team_result.round),
+                    team_result.group,
+                    team_result.team,
+                ),
+                [],
+            ).append(team_result)
+
+        # phase -> group -> team scores sorted by points, then max points
+        self.groups: Dict[str, Dict[str, List[TeamScore]]] = {}
+        team_counts: Dict[Tuple[str, str], int] = {}
+        for phase, group, _ in self.results:
+            team_counts[(phase, group)] = team_counts.get((phase, group), 0) + 1
+        for (phase, group, team), team_results in self.results.items():
+            team_score = TeamScore(team)
+            team_score.max_points = StandingsIndex.get_total_games(
+                phase, team_counts[(phase, group)]
+            )
+            for result in team_results:
+                team_score.points += result.wins_adjusted
+                team_score.max_points += (
+                    result.wins_adjusted
+                    - result.wins
+                    - result.losses
+                    - result.unstarted_games
+                )
+                team_score.losses += result.losses
+            self.groups.setdefault(phase, {}).setdefault(group, []).append(team_score)
+
+        for phase_groups in self.groups.values():
+            for team_scores in phase_groups.values():
+                team_scores.sort(key=lambda e: (e.points, e.max_points), reverse=True)
+
+    @staticmethod
+    def load(season_store: SeasonStore) -> "StandingsIndex":
+        return StandingsIndex(season_store.get_team_table_results())
+
+    @staticmethod
+    def get_phase(round: str) -> str:
+        """
+        Returns the phase of a round (ie. "Main R2" -> "Main").
+        """
+        return round.split(" ")[0]
+
+    @staticmethod
+    def get_total_games(phase: str, team_count: int) -> int:
+        """
+        Returns the number of games a team plays against the group in a phase.
+        """
+        if phase == "Qualifiers":
+            return (team_count - 1) * 6 * 2
+        elif phase == "Finals":
+            # each round is separate
+            return 13
+        return 30
+
+    def find_groups(self, group: str) -> List[Tuple[str, str, List[TeamScore]]]:
+        """
+        Returns (phase, group, team scores) for every group matching the name, ignoring case and an optional "Group " prefix.
+        """
+        group = group.strip().casefold()
+        return [
+            (phase, group_name, team_scores)
+            for phase, phase_groups in self.groups.items()
+            for group_name, team_scores in phase_groups.items()
+            if group_name.casefold() in (group, f"group {group}")
+        ]
+
+    def get_groups(self, phase: str) -> Dict[str, List[TeamScore]]:
+        """
+        Returns the sorted team scores of every group in a phase, in the order the groups appear in the standings.
+        """
+        return self.groups.get(phase, {})
+
+
+class PlayerIndex:
+    """
+    Player results from the season store, searchable by ID, profile link, name prefix or a close match of the name.
+    """
+
+    def __init__(self, player_results: Dict[int, PlayerResult]):
+        self.players = player_results
+        # (casefolded name, player ID) sorted for prefix searches
+        self.names: List[Tuple[str, int]] = sorted(
+            (player.name.casefold(), player.id) for player in player_results.values()
+        )
+        self.folded_names = [name for name, _ in self.names]
+
+    @staticmethod
+    def load(season_store: SeasonStore) -> "PlayerIndex":
+        return PlayerIndex(season_store.get_player_results())
+
+    def search(self, query: str, limit: int = 5) -> List[PlayerResult]:
+        """
+        Returns up to `limit` players matching the query. An ID or profile link returns that player, otherwise players
+        whose name starts with the query, otherwise the closest names.
+        """
+        query = query.strip()
+        player_id = parse_player_id(query)
+        if player_id is None and query.isdigit():
+            player_id = int(query)
+        if player_id is not None:
+            return [self.players[player_id]] if player_id in self.players else []
+
+        folded_query = query.casefold()
+        matches: List[PlayerResult] = []
+        i = bisect_left(self.names, (folded_query,))
+        while (
+            i < len(self.names)
+            and len(matches) < limit
+            and self.names[i][0].startswith(folded_query)
+        ):
+            matches.append(self.players[self.names[i][1]])
+            i += 1
+        if matches:
+            return matches
+
+        close_names = difflib.get_close_matches(
+            folded_query, self.folded_names, n=limit, cutoff=0.6
+        )
+        return [
+            self.players[self.names[bisect_left(self.names, (name,))][1]]
+            for name in close_names
+        ]
@@ -8,10 +8,13 @@ def log_message(msg: str, type="FIXME"):
     with open("./logs/{}.txt".format(datetime.now().isoformat()[:10]), 'a') as log_writer:
         log_writer.write(f"{output_msg}\n")
 
-def log_exception(msg: Exception | str):
+def log_exception(msg: Exception | str, trace: str | None = None):
+    # `trace` is given when the exception was caught on another thread than the one writing the log
+    if trace is None:
+        trace = traceback.format_exc()
     time_str = "[" + datetime.now().isoformat() + "] {}: ".format(type)
-    print("{}{}\n{}\n".format(time_str, repr(msg).encode(), traceback.format_exc()))
+    print("{}{}\n{}\n".format(time_str, repr(msg).encode(), trace))
     with open("./logs/{}.txt".format(datetime.now().isoformat()[:10]), 'a') as log_writer:
         log_writer.write("{}{}\n".format(time_str, repr(msg).encode()))
     with open("./errors/{}.txt".format(datetime.now().isoformat()[:10]), 'a') as log_writer:
-        log_writer.write("{}{}\n{}\n".format(time_str, repr(msg).encode(), traceback.format_exc()))
+        log_writer.write("{}{}\n{}\n".format(time_str, repr(msg).encode(), trace))